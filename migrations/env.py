@@ -14,6 +14,10 @@ from src.db.models.conversation import Conversation
 from src.db.models.user import User
 from src.db.models.event import ConversationEvent
 from src.db.models.conversation_outbox import ConversationOutbox
+from src.db.models.conversation_snapshot import ConversationSnapshot
+from src.db.models.conversation_head import ConversationHead
+from src.db.models.risk_analysis_job import RiskAnalysisJob
+from src.db.models.risk_analysis_cache import RiskAnalysisCacheEntry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -39,6 +43,15 @@ target_metadata = Base.metadata
 load_dotenv()
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # outbox partitions are created by migrations and src.outbox_retention
+    if type_ == "table":
+        return not name.startswith(
+            ("conversation_outbox_p", "conversation_outbox_default")
+        )
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -55,6 +68,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,7 +78,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
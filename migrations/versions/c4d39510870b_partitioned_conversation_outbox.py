@@ -0,0 +1,142 @@
+"""partitioned conversation outbox
+
+Revision ID: c4d39510870b
+Revises: 4af34e210cfb
+Create Date: 2026-10-18 20:32:52.239712
+
+"""
+
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d39510870b"
+down_revision: Union[str, Sequence[str], None] = "4af34e210cfb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OUTBOX_COLUMNS = (
+    "id, event_id, is_processed, created_at, updated_at, "
+    "attempts, last_error, next_attempt_at, is_dead_lettered"
+)
+# monthly partitions created ahead of time, later ones are kept by src.outbox_retention
+MONTHS_AHEAD = 2
+
+
+def _next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table("conversation_outbox", "conversation_outbox_unpartitioned")
+    op.execute(
+        "ALTER TABLE conversation_outbox_unpartitioned "
+        "RENAME CONSTRAINT conversation_outbox_pkey TO conversation_outbox_unpartitioned_pkey"
+    )
+    op.create_table(
+        "conversation_outbox",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('conversation_outbox_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("event_id", sa.String(), nullable=False),
+        sa.Column("is_processed", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "is_dead_lettered", sa.Boolean(), nullable=False, server_default="false"
+        ),
+        sa.ForeignKeyConstraint(["event_id"], ["conversations_events.id"]),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.execute(
+        "CREATE TABLE conversation_outbox_default PARTITION OF conversation_outbox DEFAULT"
+    )
+
+    first_entry = (
+        op.get_bind()
+        .execute(
+            sa.text("SELECT min(created_at) FROM conversation_outbox_unpartitioned")
+        )
+        .scalar()
+    )
+    today = datetime.datetime.now(datetime.UTC).date()
+    month = (first_entry.date() if first_entry else today).replace(day=1)
+    last_month = today.replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last_month = _next_month(last_month)
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE conversation_outbox_p{month.year:04d}{month.month:02d} "
+            f"PARTITION OF conversation_outbox "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+
+    op.execute(
+        f"INSERT INTO conversation_outbox ({OUTBOX_COLUMNS}) "
+        f"SELECT {OUTBOX_COLUMNS} FROM conversation_outbox_unpartitioned"
+    )
+    # keep the id sequence alive when the old table is dropped
+    op.execute(
+        "ALTER SEQUENCE conversation_outbox_id_seq OWNED BY conversation_outbox.id"
+    )
+    op.drop_table("conversation_outbox_unpartitioned")
+    op.create_index(
+        "ix_conversation_outbox_unprocessed",
+        "conversation_outbox",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_where="NOT is_processed",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table("conversation_outbox", "conversation_outbox_partitioned")
+    op.execute(
+        "ALTER TABLE conversation_outbox_partitioned "
+        "RENAME CONSTRAINT conversation_outbox_pkey TO conversation_outbox_partitioned_pkey"
+    )
+    op.create_table(
+        "conversation_outbox",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('conversation_outbox_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("event_id", sa.String(), nullable=False),
+        sa.Column("is_processed", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "is_dead_lettered", sa.Boolean(), nullable=False, server_default="false"
+        ),
+        sa.ForeignKeyConstraint(["event_id"], ["conversations_events.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(
+        f"INSERT INTO conversation_outbox ({OUTBOX_COLUMNS}) "
+        f"SELECT {OUTBOX_COLUMNS} FROM conversation_outbox_partitioned"
+    )
+    op.execute(
+        "ALTER SEQUENCE conversation_outbox_id_seq OWNED BY conversation_outbox.id"
+    )
+    # drops every partition with it
+    op.drop_table("conversation_outbox_partitioned")
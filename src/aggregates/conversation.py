@@ -1,6 +1,5 @@
-import datetime
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import List, Optional
 
 from src.db.models.event import ConversationEvent, EventType
 
@@ -18,7 +17,26 @@ class ConversationAggregate:
         self._user_id = user_id
         self._version = 0
         self._status: Optional[ConversationStatus] = None
-        self._messages: List[Tuple[Optional[dict], datetime.datetime]] = []
+
+    @classmethod
+    def from_snapshot(
+        cls, conversation_id: str, state: dict
+    ) -> "ConversationAggregate":
+        """Rebuild an aggregate from a state produced by `to_snapshot`."""
+        aggregate = cls(conversation_id=conversation_id, user_id=state["user_id"])
+        aggregate._version = state["version"]
+        aggregate._status = (
+            ConversationStatus(state["status"]) if state["status"] else None
+        )
+        return aggregate
+
+    def to_snapshot(self) -> dict:
+        """Serializable state needed to validate new commands."""
+        return {
+            "user_id": self._user_id,
+            "version": self._version,
+            "status": self._status.value if self._status else None,
+        }
 
     @property
     def status(self) -> Optional[ConversationStatus]:
@@ -41,7 +59,7 @@ class ConversationAggregate:
 
     def apply(self, event: ConversationEvent) -> None:
         if event.type == EventType.CONVERSATION_STARTED:
-            self._handle_conversation_started()
+            self._handle_conversation_started(event)
         elif event.type == EventType.CONVERSATION_DELETED:
             self._handle_conversation_deleted(event)
         elif event.type == EventType.NEW_MESSAGE:
@@ -50,10 +68,11 @@ class ConversationAggregate:
             raise ValueError(f"Unknown event type: {event.type}")
         self._version = event.version
 
-    def _handle_conversation_started(self) -> None:
+    def _handle_conversation_started(self, event: ConversationEvent) -> None:
         if self._status is not None:
             raise ValueError(f"Cannot start conversation with status '{self._status}'")
         self._status = ConversationStatus.ACTIVE
+        self._user_id = event.user_id
 
     def _handle_new_message(self, event: ConversationEvent) -> None:
         if self._status != ConversationStatus.ACTIVE:
@@ -64,7 +83,6 @@ class ConversationAggregate:
             raise ValueError(
                 f"User {event.user_id} cannot add message to conversation {self.conversation_id} because it is owned by {self._user_id}"
             )
-        self._messages.append((event.payload, event.created_at))
 
     def _handle_conversation_deleted(self, event: ConversationEvent) -> None:
         if self._conversation_id != event.conversation_id:
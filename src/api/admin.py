@@ -0,0 +1,33 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.api.dependencies import ConversationOutboxRepositoryDependency
+from src.dtos.outbox import DeadLetterDTO
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/outbox/dead_letters")
+async def get_dead_letters(
+    outbox_repository: ConversationOutboxRepositoryDependency,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> List[DeadLetterDTO]:
+    """List outbox entries that were given up on."""
+    dead_letters = await outbox_repository.dead_letters(limit)
+    return [DeadLetterDTO.from_outbox(outbox) for outbox in dead_letters]
+
+
+@router.post("/outbox/dead_letters/{outbox_id}/requeue")
+async def requeue_dead_letter(
+    outbox_id: int,
+    outbox_repository: ConversationOutboxRepositoryDependency,
+):
+    """Send a dead letter back to the outbox processor."""
+    async with outbox_repository.session.begin():
+        requeued = await outbox_repository.requeue(outbox_id)
+    if not requeued:
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    return {
+        "outbox_id": outbox_id,
+    }
@@ -8,8 +8,10 @@ from src.api.dependencies import (
 )
 from src.api.schemas.conversation import (
     SendMessageRequest,
+    SendMessagesBatchRequest,
 )
 from src.dtos.conversation import ConversationDTO, ConversationRiskAnalysisDTO
+from src.shared.event_store import VersionConflictError
 
 router = APIRouter(prefix="/{user_id}")
 
@@ -36,6 +38,8 @@ async def delete_conversation(
     """Send messages to a conversation."""
     try:
         await command_handler.delete_conversation(user_id, conversation_id)
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return {
@@ -55,6 +59,8 @@ async def new_message(
         message_id = await command_handler.new_message(
             user_id, conversation_id, request.text, request.sender
         )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return {
@@ -62,6 +68,29 @@ async def new_message(
     }
 
 
+@router.post("/conversations/{conversation_id}/messages:batch", status_code=201)
+async def new_messages_batch(
+    conversation_id: str,
+    user_id: str,
+    request: SendMessagesBatchRequest,
+    command_handler: ConversationCommandHandlerDependency,
+):
+    """Send several messages to a conversation in a single transaction."""
+    try:
+        message_ids = await command_handler.new_messages(
+            user_id,
+            conversation_id,
+            [(message.text, message.sender) for message in request.messages],
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "message_ids": message_ids,
+    }
+
+
 @router.get("/conversations/{conversation_id}")
 async def get_conversation(
     user_id: str,
@@ -1,16 +1,22 @@
 from typing import Annotated
 
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.command.conversation import ConversationCommandHandler
+from src.aggregates.conversation import ConversationAggregate
+from src.command.conversation import AggregateLoadMode, ConversationCommandHandler
 from src.db.repositories.conversation_analysis import ConversationRiskAnalysisRepository
+from src.db.repositories.conversation_outbox import ConversationOutboxRepository
 from src.db.repositories.user import UserRepository
+from src.db.session import async_session
 from src.query.conversation import ConversationQueryHandler
 from src.settings import settings
+from src.shared.lru_cache import LRUCache
 
-engine = create_async_engine(settings.db_connection_string, echo=settings.log_db)
-async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+aggregate_cache: LRUCache[str, ConversationAggregate] = LRUCache(
+    max_entries=settings.aggregate_cache_max_entries,
+    max_bytes=settings.aggregate_cache_max_bytes,
+)
 
 
 async def get_db_session():
@@ -21,7 +27,14 @@ async def get_db_session():
 def get_conversation_command_handler(
     session: AsyncSession = Depends(get_db_session),
 ) -> ConversationCommandHandler:
-    return ConversationCommandHandler(session)
+    return ConversationCommandHandler(
+        session,
+        snapshot_interval=settings.snapshot_interval,
+        aggregate_cache=aggregate_cache,
+        load_mode=AggregateLoadMode(settings.aggregate_load_mode),
+        max_conflict_retries=settings.command_conflict_retries,
+        conflict_backoff=settings.command_conflict_backoff,
+    )
 
 
 def get_conversation_query_handler(
@@ -42,6 +55,12 @@ def get_conversation_risk_analysis_repository(
     return ConversationRiskAnalysisRepository(session)
 
 
+def get_conversation_outbox_repository(
+    session: AsyncSession = Depends(get_db_session),
+) -> ConversationOutboxRepository:
+    return ConversationOutboxRepository(session)
+
+
 ConversationCommandHandlerDependency = Annotated[
     ConversationCommandHandler, Depends(get_conversation_command_handler)
 ]
@@ -57,3 +76,7 @@ ConversationRiskAnalysisRepositoryDependency = Annotated[
     ConversationRiskAnalysisRepository,
     Depends(get_conversation_risk_analysis_repository),
 ]
+
+ConversationOutboxRepositoryDependency = Annotated[
+    ConversationOutboxRepository, Depends(get_conversation_outbox_repository)
+]
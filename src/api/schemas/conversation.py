@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 
 class SendMessageRequest(BaseModel):
@@ -6,5 +8,9 @@ class SendMessageRequest(BaseModel):
     sender: str
 
 
+class SendMessagesBatchRequest(BaseModel):
+    messages: List[SendMessageRequest] = Field(min_length=1, max_length=500)
+
+
 class AnalyzeConversationRiskRequest(BaseModel):
     model: str = "gemini-2.0-flash"
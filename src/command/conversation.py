@@ -1,17 +1,54 @@
-from typing import Optional
+import asyncio
+import copy
+import logging
+import random
+from enum import Enum
+from typing import List, Optional, Tuple
 from uuid import uuid4
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.aggregates.conversation import ConversationAggregate
 from src.db.models.event import ConversationEvent, EventType
-from src.shared.event_store import EventStore
+from src.shared.event_store import (
+    EventStore,
+    VersionConflictError,
+    is_version_conflict,
+)
+from src.shared.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class AggregateLoadMode(str, Enum):
+    """How the command side rebuilds an aggregate that is not cached."""
+
+    # read the stored head row
+    STATE = "state"
+    # replay events from the latest snapshot
+    REPLAY = "replay"
+    # do both and report divergences, trusting the replay
+    VERIFY = "verify"
 
 
 class ConversationCommandHandler:
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        snapshot_interval: int = 50,
+        aggregate_cache: Optional[LRUCache[str, ConversationAggregate]] = None,
+        load_mode: AggregateLoadMode = AggregateLoadMode.STATE,
+        max_conflict_retries: int = 3,
+        conflict_backoff: float = 0.02,
+    ):
         self._session = session
         self._event_store = EventStore(session)
+        self._snapshot_interval = snapshot_interval
+        self._aggregate_cache = aggregate_cache
+        self._load_mode = load_mode
+        self._max_conflict_retries = max_conflict_retries
+        self._conflict_backoff = conflict_backoff
 
     async def start_conversation(self, user_id: str) -> str:
         """Start a new conversation."""
@@ -37,6 +74,24 @@ class ConversationCommandHandler:
         )
         return message_id
 
+    async def new_messages(
+        self, user_id: str, conversation_id: str, messages: List[Tuple[str, str]]
+    ) -> List[str]:
+        """Add several (text, sender) messages to the conversation at once."""
+        message_ids = [str(uuid4()) for _ in messages]
+        await self._handle_commands(
+            conversation_id,
+            user_id,
+            [
+                (
+                    EventType.NEW_MESSAGE,
+                    {"sender": sender, "text": text, "message_id": message_id},
+                )
+                for (text, sender), message_id in zip(messages, message_ids)
+            ],
+        )
+        return message_ids
+
     async def delete_conversation(self, user_id: str, conversation_id: str) -> str:
         """Delete a message from the conversation."""
         await self._handle_command(
@@ -54,19 +109,132 @@ class ConversationCommandHandler:
         event_type: EventType,
         payload: Optional[dict] = None,
     ) -> None:
-        async with self._session.begin():
-            events = await self._event_store.retrieve_events(conversation_id)
+        await self._handle_commands(conversation_id, user_id, [(event_type, payload)])
+
+    async def _handle_commands(
+        self,
+        conversation_id: str,
+        user_id: str,
+        commands: List[Tuple[EventType, Optional[dict]]],
+    ) -> None:
+        """Append one event per command as consecutive versions in one transaction."""
+        current: Optional[ConversationAggregate] = None
+        attempt = 0
+        while True:
+            try:
+                async with self._session.begin():
+                    if current is None:
+                        current = await self._load_aggregate(conversation_id, user_id)
+                    else:
+                        # another writer got ahead of us, fetch only what we missed
+                        current.apply_events(
+                            await self._event_store.retrieve_events(
+                                conversation_id, after_version=current.version
+                            )
+                        )
+                    aggregate = copy.copy(current)
+                    events = []
+                    for event_type, payload in commands:
+                        event = ConversationEvent(
+                            conversation_id=conversation_id,
+                            user_id=user_id,
+                            type=event_type,
+                            payload=payload,
+                            version=aggregate.version + 1,
+                        )
+                        aggregate.apply(event)
+                        events.append(event)
+                    await self._event_store.append_events(
+                        events, aggregate.to_snapshot()
+                    )
+                    if (
+                        aggregate.version // self._snapshot_interval
+                        > current.version // self._snapshot_interval
+                    ):
+                        await self._event_store.save_snapshot(
+                            conversation_id, aggregate.version, aggregate.to_snapshot()
+                        )
+            except IntegrityError as e:
+                if not is_version_conflict(e):
+                    raise
+                if self._aggregate_cache is not None:
+                    self._aggregate_cache.evict(conversation_id)
+                if attempt >= self._max_conflict_retries:
+                    raise VersionConflictError(
+                        f"Conversation {conversation_id} kept changing after {attempt + 1} attempts"
+                    ) from e
+                attempt += 1
+                logger.info(
+                    f"Version conflict on conversation {conversation_id}, retry {attempt}"
+                )
+                await asyncio.sleep(
+                    random.uniform(0, self._conflict_backoff * 2**attempt)
+                )
+            else:
+                break
+        if self._aggregate_cache is not None:
+            self._aggregate_cache.put(conversation_id, aggregate)
+
+    async def _load_aggregate(
+        self, conversation_id: str, user_id: str
+    ) -> ConversationAggregate:
+        """Restore the aggregate from cache or snapshot, then apply newer events."""
+        cached = (
+            self._aggregate_cache.get(conversation_id)
+            if self._aggregate_cache is not None
+            else None
+        )
+        if cached is not None:
+            # work on a copy so a failed command leaves the cached state untouched
+            aggregate = copy.copy(cached)
+        elif self._load_mode == AggregateLoadMode.STATE:
+            head = await self._event_store.load_head(conversation_id)
+            if head is not None:
+                # the head is written with every event, so there is no tail to replay
+                return ConversationAggregate.from_snapshot(
+                    conversation_id, head.to_state()
+                )
+            aggregate = await self._replay_aggregate(conversation_id, user_id)
+        elif self._load_mode == AggregateLoadMode.VERIFY:
+            aggregate = await self._replay_aggregate(conversation_id, user_id)
+            await self._verify_head(aggregate)
+        else:
+            aggregate = await self._replay_aggregate(conversation_id, user_id)
+        events = await self._event_store.retrieve_events(
+            conversation_id, after_version=aggregate.version
+        )
+        aggregate.apply_events(events)
+        return aggregate
+
+    async def _replay_aggregate(
+        self, conversation_id: str, user_id: str
+    ) -> ConversationAggregate:
+        aggregate = await self._restore_aggregate(conversation_id, user_id)
+        events = await self._event_store.retrieve_events(
+            conversation_id, after_version=aggregate.version
+        )
+        aggregate.apply_events(events)
+        return aggregate
+
+    async def _verify_head(self, aggregate: ConversationAggregate) -> None:
+        head = await self._event_store.load_head(aggregate.conversation_id)
+        replayed = aggregate.to_snapshot()
+        if head is not None and head.to_state() != replayed:
+            logger.warning(
+                f"Stored head {head.to_state()} of conversation {aggregate.conversation_id} "
+                f"diverges from replayed state {replayed}"
+            )
+
+    async def _restore_aggregate(
+        self, conversation_id: str, user_id: str
+    ) -> ConversationAggregate:
+        snapshot = await self._event_store.load_snapshot(conversation_id)
+        if snapshot is None:
             aggregate = ConversationAggregate(
                 conversation_id=conversation_id, user_id=user_id
             )
-            aggregate.apply_events(events)
-
-            event = ConversationEvent(
-                conversation_id=conversation_id,
-                user_id=user_id,
-                type=event_type,
-                payload=payload,
-                version=aggregate.version + 1,
+        else:
+            aggregate = ConversationAggregate.from_snapshot(
+                conversation_id, snapshot.state
             )
-            aggregate.apply(event)
-            await self._event_store.append_event(event)
+        return aggregate
@@ -24,12 +24,15 @@ class Conversation(Base):
         nullable=False,
     )
 
-    def to_text(self) -> str:
-        lines = [
-            f"Name: {self.user.name}\tEmail: {self.user.email}\n",
-            "Messages:\n\n",
-            "=========BEGIN=============\n",
-        ]
+    def to_text(self, summary: Optional[str] = None) -> str:
+        """Render the loaded messages, after the summary of earlier ones if given."""
+        lines = [f"Name: {self.user.name}\tEmail: {self.user.email}\n"]
+        if summary is not None:
+            lines.append(f"Summary of earlier messages:\n\n{summary}\n")
+            lines.append("New messages:\n\n")
+        else:
+            lines.append("Messages:\n\n")
+        lines.append("=========BEGIN=============\n")
         self.messages.sort(key=lambda m: m.version)
         for message in self.messages:
             lines.append(f"At: {message.created_at}\nText: {message.text}\n\n")
@@ -62,6 +65,12 @@ class ConversationRiskAnalysis(Base):
     id: Mapped[str] = mapped_column(
         primary_key=True, default_factory=lambda: str(uuid4())
     )
+    # version of the last message the analysis covers
+    analyzed_version: Mapped[Optional[int]] = mapped_column(nullable=True, default=None)
+    # compact context the next analysis gets instead of the analyzed messages
+    summary: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+    # incremental analyses since the last one that read the whole transcript
+    analyses_since_full: Mapped[int] = mapped_column(default=0, nullable=False)
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
         default_factory=lambda: datetime.datetime.now(datetime.UTC),
@@ -0,0 +1,24 @@
+import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from src.db.models.base import Base
+
+
+class ConversationHead(Base):
+    """Current write-side state of a conversation, kept in sync with its events."""
+
+    __tablename__ = "conversations_heads"
+    conversation_id: Mapped[str] = mapped_column(primary_key=True, nullable=False)
+    user_id: Mapped[str] = mapped_column(nullable=False)
+    status: Mapped[str] = mapped_column(nullable=False)
+    version: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=lambda: datetime.datetime.now(datetime.UTC),
+        nullable=False,
+    )
+
+    def to_state(self) -> dict:
+        return {"user_id": self.user_id, "version": self.version, "status": self.status}
@@ -1,7 +1,7 @@
 import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import DDL, DateTime, ForeignKey, Index, event
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from src.db.models.base import Base
@@ -16,11 +16,44 @@ class ConversationOutbox(Base):
     )
     event: Mapped[ConversationEvent] = relationship("ConversationEvent")
     is_processed: Mapped[bool] = mapped_column(default=False, nullable=False)
+    # part of the primary key because the table is partitioned by it
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         nullable=False,
         default_factory=lambda: datetime.datetime.now(datetime.UTC),
     )
     updated_at: Mapped[Optional[datetime.datetime]] = mapped_column(
         DateTime(timezone=True), nullable=True, default=None
     )
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+    # failed entries are not claimed again before then
+    next_attempt_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+    # given up after too many attempts, no longer holds back its conversation
+    is_dead_lettered: Mapped[bool] = mapped_column(default=False, nullable=False)
+
+    __table_args__ = (
+        # only the unprocessed tail is scanned when claiming entries
+        Index(
+            "ix_conversation_outbox_unprocessed",
+            "created_at",
+            "id",
+            postgresql_where="NOT is_processed",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# monthly partitions are managed by migrations and `src.outbox_retention`,
+# rows outside of them land in the default partition
+event.listen(
+    ConversationOutbox.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS conversation_outbox_default "
+        "PARTITION OF conversation_outbox DEFAULT"
+    ),
+)
@@ -0,0 +1,18 @@
+import datetime
+
+from sqlalchemy import JSON, DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from src.db.models.base import Base
+
+
+class ConversationSnapshot(Base):
+    __tablename__ = "conversations_snapshots"
+    conversation_id: Mapped[str] = mapped_column(primary_key=True, nullable=False)
+    version: Mapped[int] = mapped_column(nullable=False)
+    state: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=lambda: datetime.datetime.now(datetime.UTC),
+        nullable=False,
+    )
@@ -0,0 +1,23 @@
+import datetime
+
+from sqlalchemy import DateTime, JSON
+from sqlalchemy.orm import mapped_column, Mapped
+
+from src.db.models.base import Base
+
+
+class RiskAnalysisCacheEntry(Base):
+    """Assessment returned for a prompt, so an unchanged transcript is not sent again."""
+
+    __tablename__ = "risk_analysis_cache"
+    # hash of the model and the rendered prompt
+    id: Mapped[str] = mapped_column(primary_key=True, nullable=False)
+    analysis: Mapped[dict] = mapped_column(JSON)
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default_factory=lambda: datetime.datetime.now(datetime.UTC),
+    )
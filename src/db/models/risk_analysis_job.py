@@ -0,0 +1,43 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index
+from sqlalchemy.orm import mapped_column, Mapped
+
+from src.db.models.base import Base
+
+
+class RiskAnalysisJob(Base):
+    """Pending risk analysis of a conversation, enqueued when its events are projected."""
+
+    __tablename__ = "risk_analysis_jobs"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, init=False)
+    conversation_id: Mapped[str] = mapped_column(nullable=False, index=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default_factory=lambda: datetime.datetime.now(datetime.UTC),
+    )
+    # postponed while new messages keep arriving, see RiskAnalysisJobRepository.enqueue
+    run_after: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default_factory=lambda: datetime.datetime.now(datetime.UTC),
+    )
+    # a consumer works on the job until then, afterwards it can be claimed again
+    locked_until: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+    # failed analyses are retried with backoff until the attempts run out
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+
+    __table_args__ = (
+        # requests for a conversation coalesce into its single pending job
+        Index(
+            "uq_risk_analysis_jobs_pending_conversation",
+            "conversation_id",
+            unique=True,
+            postgresql_where="locked_until IS NULL",
+        ),
+    )
@@ -1,6 +1,7 @@
 from typing import Any, Protocol, Type, Optional, List
 
-from sqlalchemy import select, update
+from sqlalchemy import any_, bindparam, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -21,6 +22,18 @@ class BaseRepository[T: ModelWithId]:
         self._session.add(obj)
         return obj
 
+    async def save_all(self, objs: List[T]) -> List[T]:
+        self._session.add_all(objs)
+        return objs
+
+    async def insert_many(self, values: List[dict]) -> None:
+        """Insert rows with a single multi-row statement, skipping existing ones."""
+        if not values:
+            return
+        await self._session.execute(
+            insert(self._model).values(values).on_conflict_do_nothing()
+        )
+
     async def get(self, id_: Any) -> Optional[T]:
         if not hasattr(self._model, "id"):
             raise ValueError(f"Need id in model {self._model}")
@@ -36,3 +49,16 @@ class BaseRepository[T: ModelWithId]:
     async def update(self, id_: Any, **kwargs) -> None:
         stmt = update(self._model).where(self._model.id == id_).values(**kwargs)
         await self._session.execute(stmt)
+
+    async def update_many(self, ids: List[Any], **kwargs) -> None:
+        if not ids:
+            return
+        # a single array parameter keeps one prepared statement for any batch size
+        ids_param = bindparam("ids", ids, type_=ARRAY(self._model.id.type))
+        stmt = (
+            update(self._model)
+            .where(self._model.id == any_(ids_param))
+            .values(**kwargs)
+            .execution_options(synchronize_session="fetch")
+        )
+        await self._session.execute(stmt)
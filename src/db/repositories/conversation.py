@@ -4,7 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.db.models.conversation import Conversation
+from src.db.models.conversation import Conversation, ConversationMessage
 from src.db.repositories.base import BaseRepository
 
 
@@ -23,3 +23,22 @@ class ConversationRepository(BaseRepository):
             )
         )
         return result.scalar()
+
+    async def get_with_messages_after(
+        self, id_: str, after_version: int
+    ) -> Optional[Conversation]:
+        """Load a conversation with only the messages newer than the given version."""
+        result = await self._session.execute(
+            select(Conversation)
+            .where(Conversation.id == id_)
+            .options(
+                selectinload(
+                    Conversation.messages.and_(
+                        ConversationMessage.version > after_version
+                    )
+                ),
+                selectinload(Conversation.user),
+            )
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -33,3 +33,14 @@ class ConversationRiskAnalysisRepository(BaseRepository):
             )
         results = await self._session.execute(stmt)
         return list(results.scalars().all())
+
+    async def get_latest(
+        self, conversation_id: str
+    ) -> Optional[ConversationRiskAnalysis]:
+        result = await self._session.execute(
+            select(ConversationRiskAnalysis)
+            .where(ConversationRiskAnalysis.conversation_id == conversation_id)
+            .order_by(ConversationRiskAnalysis.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar()
@@ -1,6 +1,6 @@
 from typing import List
 
-from sqlalchemy import select
+from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models.event import ConversationEvent
@@ -12,11 +12,16 @@ class ConversationEventRepository(BaseRepository):
         super().__init__(session, ConversationEvent)
 
     async def get_all_conversation_events(
-        self, conversation_id: str
+        self, conversation_id: str, after_version: int = 0
     ) -> List[ConversationEvent]:
         stmt = (
             select(ConversationEvent)
-            .where(ConversationEvent.conversation_id == conversation_id)
+            .where(
+                and_(
+                    ConversationEvent.conversation_id == conversation_id,
+                    ConversationEvent.version > after_version,
+                )
+            )
             .order_by(ConversationEvent.version)
         )
         results = await self._session.execute(stmt)
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models.conversation_head import ConversationHead
+from src.db.repositories.base import BaseRepository
+
+
+class ConversationHeadRepository(BaseRepository):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, ConversationHead)
+
+    async def get_by_conversation(
+        self, conversation_id: str
+    ) -> Optional[ConversationHead]:
+        result = await self._session.execute(
+            select(ConversationHead).where(
+                ConversationHead.conversation_id == conversation_id
+            )
+        )
+        return result.scalar()
+
+    async def upsert(self, head: ConversationHead) -> None:
+        stmt = insert(ConversationHead).values(
+            conversation_id=head.conversation_id,
+            user_id=head.user_id,
+            status=head.status,
+            version=head.version,
+            updated_at=head.updated_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ConversationHead.conversation_id],
+            set_={
+                "user_id": stmt.excluded.user_id,
+                "status": stmt.excluded.status,
+                "version": stmt.excluded.version,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=ConversationHead.version < stmt.excluded.version,
+        )
+        await self._session.execute(stmt)
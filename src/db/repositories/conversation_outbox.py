@@ -1,22 +1,175 @@
-from typing import List
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import func, literal, or_, select, tuple_, update
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models.conversation_outbox import ConversationOutbox
+from src.db.models.event import ConversationEvent
 from src.db.repositories.base import BaseRepository
 
 
+OutboxCursor = Tuple[datetime.datetime, int]
+
+
+class ClaimedBatch(NamedTuple):
+    entries: List[ConversationOutbox]
+    # position of the last claimed entry, None when nothing was claimed
+    cursor: Optional[OutboxCursor]
+
+
 class ConversationOutboxRepository(BaseRepository):
     def __init__(self, session: AsyncSession):
         super().__init__(session, ConversationOutbox)
 
-    async def all_unprocessed(self) -> List[ConversationOutbox]:
+    async def claim_unprocessed(
+        self,
+        limit: int,
+        after: Optional[OutboxCursor] = None,
+        lane: int = 0,
+        lanes: int = 1,
+    ) -> ClaimedBatch:
+        """Lock the oldest unprocessed entries no other processor is working on.
+
+        Entries are paginated by (created_at, id) starting after `after`.
+        Entries of a conversation are only returned up to the first unprocessed
+        entry we could not claim, so every conversation is still projected in
+        order when several processors run at the same time. Entries waiting for
+        a retry are skipped, dead letters are ignored. Locks are held until the
+        current transaction ends.
+
+        With `lanes` > 1 only conversations hashing to `lane` are claimed, so
+        lanes can run side by side without touching each other's conversations.
+        """
+        stmt = select(ConversationOutbox).where(
+            ConversationOutbox.is_processed == False,
+            ConversationOutbox.is_dead_lettered == False,
+            or_(
+                ConversationOutbox.next_attempt_at.is_(None),
+                ConversationOutbox.next_attempt_at
+                <= datetime.datetime.now(datetime.UTC),
+            ),
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(ConversationOutbox.created_at, ConversationOutbox.id)
+                > tuple_(*(literal(value) for value in after))
+            )
+        if lanes > 1:
+            stmt = stmt.join(ConversationOutbox.event).where(
+                func.abs(func.hashtext(ConversationEvent.conversation_id) % lanes)
+                == lane
+            )
+        results = await self._session.execute(
+            stmt.options(selectinload(ConversationOutbox.event))
+            .order_by(ConversationOutbox.created_at, ConversationOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=ConversationOutbox)
+        )
+        claimed = list(results.scalars().all())
+        if not claimed:
+            return ClaimedBatch(entries=[], cursor=None)
+
+        first_unclaimed = await self._first_unclaimed_per_conversation(claimed)
+        cursor = (claimed[-1].created_at, claimed[-1].id)
+        return ClaimedBatch(
+            entries=[
+                outbox
+                for outbox in claimed
+                if outbox.event.conversation_id not in first_unclaimed
+                or (outbox.created_at, outbox.id)
+                < first_unclaimed[outbox.event.conversation_id]
+            ],
+            cursor=cursor,
+        )
+
+    async def mark_processed(self, ids: List[int]) -> None:
+        await self.update_many(
+            ids, is_processed=True, updated_at=datetime.datetime.now(datetime.UTC)
+        )
+
+    async def schedule_retry(
+        self,
+        id_: int,
+        attempts: int,
+        last_error: str,
+        next_attempt_at: datetime.datetime,
+    ) -> None:
+        await self.update(
+            id_,
+            attempts=attempts,
+            last_error=last_error,
+            next_attempt_at=next_attempt_at,
+            updated_at=datetime.datetime.now(datetime.UTC),
+        )
+
+    async def dead_letter(self, id_: int, attempts: int, last_error: str) -> None:
+        await self.update(
+            id_,
+            attempts=attempts,
+            last_error=last_error,
+            next_attempt_at=None,
+            is_dead_lettered=True,
+            updated_at=datetime.datetime.now(datetime.UTC),
+        )
+
+    async def dead_letters(self, limit: int = 100) -> List[ConversationOutbox]:
         results = await self._session.execute(
             select(ConversationOutbox)
-            .where(ConversationOutbox.is_processed == False)
+            .where(ConversationOutbox.is_dead_lettered == True)
             .options(selectinload(ConversationOutbox.event))
-            .order_by(ConversationOutbox.created_at)
+            .order_by(ConversationOutbox.created_at, ConversationOutbox.id)
+            .limit(limit)
         )
         return list(results.scalars().all())
+
+    async def requeue(self, id_: int) -> bool:
+        """Give a dead letter a fresh set of attempts, returning False if there is none."""
+        result = await self._session.execute(
+            update(ConversationOutbox)
+            .where(
+                ConversationOutbox.id == id_,
+                ConversationOutbox.is_dead_lettered == True,
+            )
+            .values(
+                attempts=0,
+                next_attempt_at=None,
+                is_dead_lettered=False,
+                updated_at=datetime.datetime.now(datetime.UTC),
+            )
+            .returning(ConversationOutbox.id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def _first_unclaimed_per_conversation(
+        self, claimed: List[ConversationOutbox]
+    ) -> dict[str, OutboxCursor]:
+        results = await self._session.execute(
+            select(
+                ConversationEvent.conversation_id,
+                ConversationOutbox.created_at,
+                ConversationOutbox.id,
+            )
+            .join(
+                ConversationEvent, ConversationOutbox.event_id == ConversationEvent.id
+            )
+            .where(
+                ConversationOutbox.is_processed == False,
+                ConversationOutbox.is_dead_lettered == False,
+                ConversationEvent.conversation_id.in_(
+                    {outbox.event.conversation_id for outbox in claimed}
+                ),
+                ConversationOutbox.id.not_in([outbox.id for outbox in claimed]),
+            )
+            .distinct(ConversationEvent.conversation_id)
+            .order_by(
+                ConversationEvent.conversation_id,
+                ConversationOutbox.created_at,
+                ConversationOutbox.id,
+            )
+        )
+        return {
+            conversation_id: (created_at, id_)
+            for conversation_id, created_at, id_ in results.all()
+        }
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models.conversation_snapshot import ConversationSnapshot
+from src.db.repositories.base import BaseRepository
+
+
+class ConversationSnapshotRepository(BaseRepository):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, ConversationSnapshot)
+
+    async def get_latest(self, conversation_id: str) -> Optional[ConversationSnapshot]:
+        result = await self._session.execute(
+            select(ConversationSnapshot).where(
+                ConversationSnapshot.conversation_id == conversation_id
+            )
+        )
+        return result.scalar()
+
+    async def upsert(self, snapshot: ConversationSnapshot) -> None:
+        """Keep only the most recent snapshot of a conversation."""
+        stmt = insert(ConversationSnapshot).values(
+            conversation_id=snapshot.conversation_id,
+            version=snapshot.version,
+            state=snapshot.state,
+            created_at=snapshot.created_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ConversationSnapshot.conversation_id],
+            set_={
+                "version": stmt.excluded.version,
+                "state": stmt.excluded.state,
+                "created_at": stmt.excluded.created_at,
+            },
+            where=ConversationSnapshot.version < stmt.excluded.version,
+        )
+        await self._session.execute(stmt)
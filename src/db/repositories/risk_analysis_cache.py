@@ -0,0 +1,50 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models.risk_analysis_cache import RiskAnalysisCacheEntry
+from src.db.repositories.base import BaseRepository
+
+
+class RiskAnalysisCacheRepository(BaseRepository):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, RiskAnalysisCacheEntry)
+
+    async def get_valid(self, id_: str) -> Optional[RiskAnalysisCacheEntry]:
+        result = await self._session.execute(
+            select(RiskAnalysisCacheEntry).where(
+                RiskAnalysisCacheEntry.id == id_,
+                RiskAnalysisCacheEntry.expires_at > func.now(),
+            )
+        )
+        return result.scalar()
+
+    async def upsert(self, id_: str, analysis: dict, ttl: float) -> None:
+        """Store an analysis, extending the lifetime of an existing entry."""
+        now = datetime.datetime.now(datetime.UTC)
+        stmt = insert(RiskAnalysisCacheEntry).values(
+            id=id_,
+            analysis=analysis,
+            expires_at=now + datetime.timedelta(seconds=ttl),
+            created_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RiskAnalysisCacheEntry.id],
+            set_={
+                "analysis": stmt.excluded.analysis,
+                "expires_at": stmt.excluded.expires_at,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+        await self._session.execute(stmt)
+
+    async def delete_expired(self) -> int:
+        result = await self._session.execute(
+            delete(RiskAnalysisCacheEntry)
+            .where(RiskAnalysisCacheEntry.expires_at <= func.now())
+            .returning(RiskAnalysisCacheEntry.id)
+        )
+        return len(result.all())
@@ -0,0 +1,118 @@
+import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models.risk_analysis_job import RiskAnalysisJob
+from src.db.repositories.base import BaseRepository
+
+
+class RiskAnalysisJobRepository(BaseRepository):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, RiskAnalysisJob)
+
+    async def enqueue(
+        self,
+        conversation_ids: List[str],
+        quiet_period: float = 0,
+        max_delay: float = 0,
+    ) -> None:
+        """Request analyses, merging them into each conversation's pending job.
+
+        A job runs once its conversation was quiet for `quiet_period` seconds,
+        but no later than `max_delay` seconds after it was first requested.
+        """
+        if not conversation_ids:
+            return
+        now = datetime.datetime.now(datetime.UTC)
+        run_after = now + datetime.timedelta(seconds=min(quiet_period, max_delay))
+        stmt = insert(RiskAnalysisJob).values(
+            [
+                {
+                    "conversation_id": conversation_id,
+                    "created_at": now,
+                    "run_after": run_after,
+                }
+                for conversation_id in dict.fromkeys(conversation_ids)
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RiskAnalysisJob.conversation_id],
+            index_where=RiskAnalysisJob.locked_until.is_(None),
+            set_={
+                "run_after": func.least(
+                    stmt.excluded.run_after,
+                    RiskAnalysisJob.created_at + datetime.timedelta(seconds=max_delay),
+                )
+            },
+        )
+        await self._session.execute(stmt)
+
+    async def claim(self, limit: int, lease: float) -> List[RiskAnalysisJob]:
+        """Lease the oldest jobs that nobody is working on.
+
+        Jobs stay leased after the claiming transaction commits, so the analysis
+        itself runs without holding a transaction. Jobs whose lease expired
+        without being completed are handed out again.
+        """
+        now = datetime.datetime.now(datetime.UTC)
+        available = (
+            select(RiskAnalysisJob.id)
+            .where(
+                or_(
+                    RiskAnalysisJob.locked_until.is_(None),
+                    RiskAnalysisJob.locked_until < now,
+                ),
+                RiskAnalysisJob.run_after <= now,
+            )
+            .order_by(RiskAnalysisJob.run_after, RiskAnalysisJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        results = await self._session.execute(
+            update(RiskAnalysisJob)
+            .where(RiskAnalysisJob.id.in_(available))
+            .values(locked_until=now + datetime.timedelta(seconds=lease))
+            .returning(RiskAnalysisJob)
+        )
+        return sorted(results.scalars().all(), key=lambda job: (job.run_after, job.id))
+
+    async def has_pending(self, conversation_id: str) -> bool:
+        """Whether the conversation has a job nobody claimed yet."""
+        result = await self._session.execute(
+            select(
+                exists().where(
+                    RiskAnalysisJob.conversation_id == conversation_id,
+                    RiskAnalysisJob.locked_until.is_(None),
+                )
+            )
+        )
+        return result.scalar_one()
+
+    async def next_run_after(self) -> Optional[datetime.datetime]:
+        """When the earliest job nobody is working on becomes due."""
+        result = await self._session.execute(
+            select(func.min(RiskAnalysisJob.run_after)).where(
+                RiskAnalysisJob.locked_until.is_(None)
+            )
+        )
+        return result.scalar()
+
+    async def schedule_retry(
+        self,
+        job_id: int,
+        attempts: int,
+        last_error: str,
+        retry_at: datetime.datetime,
+    ) -> None:
+        """Keep a failed job leased until its retry is due."""
+        await self.update(
+            job_id, attempts=attempts, last_error=last_error, locked_until=retry_at
+        )
+
+    async def complete(self, job_id: int) -> None:
+        await self._session.execute(
+            delete(RiskAnalysisJob).where(RiskAnalysisJob.id == job_id)
+        )
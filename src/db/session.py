@@ -0,0 +1,10 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+
+from src.settings import settings
+
+engine = create_async_engine(
+    settings.db_connection_string,
+    echo=settings.log_db,
+    pool_size=settings.db_pool_size,
+)
+async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.db.models.conversation_outbox import ConversationOutbox
+
+
+class DeadLetterDTO(BaseModel):
+    id: int
+    event_id: str
+    conversation_id: str
+    event_type: str
+    version: int
+    attempts: int
+    last_error: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_outbox(cls, outbox: ConversationOutbox) -> "DeadLetterDTO":
+        return cls(
+            id=outbox.id,
+            event_id=outbox.event_id,
+            conversation_id=outbox.event.conversation_id,
+            event_type=outbox.event.type,
+            version=outbox.event.version,
+            attempts=outbox.attempts,
+            last_error=outbox.last_error,
+            created_at=outbox.created_at,
+            updated_at=outbox.updated_at,
+        )
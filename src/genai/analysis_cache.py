@@ -0,0 +1,62 @@
+import datetime
+import hashlib
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.repositories.risk_analysis_cache import RiskAnalysisCacheRepository
+from src.genai.risk_analyzer_clients.base import AIAnalysis
+from src.shared.lru_cache import LRUCache, approximate_size
+
+
+def analysis_cache_key(model_id: str, prompt: str) -> str:
+    """Content address of an assessment, the prompt holds its version and the transcript."""
+    digest = hashlib.sha256()
+    digest.update(model_id.encode())
+    digest.update(b"\0")
+    digest.update(prompt.encode())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Assessments by content address, in memory and in Postgres for `ttl` seconds.
+
+    Methods run in the caller's transaction, like the repositories do.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self._ttl = ttl
+        # entries expire in memory too, so a process does not outlive the table
+        self._memory: LRUCache[str, Tuple[AIAnalysis, float]] = LRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda entry: approximate_size(entry[0]),
+        )
+
+    async def get(self, session: AsyncSession, key: str) -> Optional[AIAnalysis]:
+        cached = self._memory.get(key)
+        if cached is not None:
+            analysis, expires_at = cached
+            if expires_at > time.monotonic():
+                return analysis
+            self._memory.evict(key)
+        entry = await RiskAnalysisCacheRepository(session).get_valid(key)
+        if entry is None:
+            return None
+        analysis = AIAnalysis(**entry.analysis)
+        self._remember(
+            key,
+            analysis,
+            (entry.expires_at - datetime.datetime.now(datetime.UTC)).total_seconds(),
+        )
+        return analysis
+
+    async def put(self, session: AsyncSession, key: str, analysis: AIAnalysis) -> None:
+        await RiskAnalysisCacheRepository(session).upsert(
+            key, analysis.model_dump(), self._ttl
+        )
+        self._remember(key, analysis, self._ttl)
+
+    def _remember(self, key: str, analysis: AIAnalysis, ttl: float) -> None:
+        self._memory.put(key, (analysis, time.monotonic() + ttl))
@@ -0,0 +1,140 @@
+import re
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Dict, List, Sequence
+
+# weight of a match, the score of a text is its heaviest match
+RISK_TERMS: Dict[str, float] = {
+    r"kill(?:ing)? myself": 1.0,
+    r"suicid(?:e|al)": 1.0,
+    r"end(?:ing)? (?:my|it) (?:life|all)": 1.0,
+    r"take my (?:own )?life": 1.0,
+    r"want(?:ed)? to die": 1.0,
+    r"better off dead": 1.0,
+    r"no reason to live": 1.0,
+    r"self[- ]?harm": 1.0,
+    r"(?:cut|hurt|harm)(?:ting)? myself": 1.0,
+    r"hang myself": 1.0,
+    r"overdos(?:e|ing)": 1.0,
+    r"can'?t go on": 0.6,
+    r"hopeless": 0.6,
+    r"worthless": 0.6,
+    r"pills": 0.6,
+    r"goodbye forever": 0.6,
+    r"\bdie\b": 0.6,
+    r"\bdead\b": 0.6,
+    r"depress(?:ed|ion)": 0.3,
+    r"alone": 0.3,
+    r"empty": 0.3,
+    r"tired of (?:everything|it all|living)": 0.3,
+}
+
+# whole messages that carry nothing to assess, only greetings and acknowledgements,
+# answers like "yes" or "no" may reply to a question about risk
+BENIGN_PHRASES: Sequence[str] = (
+    r"ok(?:ay)?",
+    r"thanks?(?: you)?(?: so much)?",
+    r"thx",
+    r"hi",
+    r"hello",
+    r"hey",
+    r"good (?:morning|afternoon|evening)",
+    r"cool",
+    r"great",
+    r"nice",
+    r"got it",
+    r"lol",
+)
+
+
+class PreScreenMode(str, Enum):
+    """Which analyses the pre-screener may keep from the analyzer."""
+
+    # every analysis goes to the analyzer
+    OFF = "off"
+    # skipped when no new message scores at least the threshold
+    THRESHOLD = "threshold"
+    # skipped only when every new message is known to be benign
+    STRICT = "strict"
+
+
+class PreScreener(ABC):
+    """Cheap local check deciding whether new messages are worth an analyzer call."""
+
+    def __init__(
+        self,
+        mode: PreScreenMode = PreScreenMode.STRICT,
+        threshold: float = 0.5,
+        sample_every: int = 10,
+    ):
+        self._mode = mode
+        self._threshold = threshold
+        self._sample_every = sample_every
+
+    @abstractmethod
+    def score(self, text: str) -> float:
+        """Risk of a message between 0 and 1."""
+
+    def is_benign(self, text: str) -> bool:
+        """Whether a message certainly carries no risk, screeners that cannot tell say no."""
+        return False
+
+    def should_analyze(self, new_messages: List[str]) -> bool:
+        if self._mode == PreScreenMode.OFF or not new_messages:
+            return True
+        if 0 < self._sample_every <= len(new_messages):
+            # a safety sample, skipped messages pile up until then
+            return True
+        if self._mode == PreScreenMode.STRICT:
+            return not all(
+                self.is_benign(text) and self.score(text) == 0 for text in new_messages
+            )
+        return max(self.score(text) for text in new_messages) >= self._threshold
+
+
+class LexiconPreScreener(PreScreener):
+    """Scores messages by the risk terms they contain, in a single regex pass."""
+
+    def __init__(
+        self,
+        mode: PreScreenMode = PreScreenMode.STRICT,
+        threshold: float = 0.5,
+        sample_every: int = 10,
+        risk_terms: Dict[str, float] = RISK_TERMS,
+        benign_phrases: Sequence[str] = BENIGN_PHRASES,
+    ):
+        super().__init__(mode, threshold, sample_every)
+        # one alternation, the named group of a match tells which term it was
+        self._weights = {
+            f"t{i}": weight for i, weight in enumerate(risk_terms.values())
+        }
+        self._risk_pattern = re.compile(
+            "|".join(f"(?P<t{i}>{term})" for i, term in enumerate(risk_terms.keys())),
+            re.IGNORECASE,
+        )
+        # a message may string a few of them together, "ok thanks!"
+        self._benign_pattern = re.compile(
+            "(?:(?:" + "|".join(benign_phrases) + r")\b[\s!.,:)]*)+", re.IGNORECASE
+        )
+
+    def score(self, text: str) -> float:
+        return max(
+            (self._weight(match) for match in self._risk_pattern.finditer(text)),
+            default=0.0,
+        )
+
+    def _weight(self, match: re.Match[str]) -> float:
+        # every alternative is a named group, one of them matched
+        assert match.lastgroup is not None
+        return self._weights[match.lastgroup]
+
+    def matched_terms(self, text: str) -> List[str]:
+        """Distinct risk terms found in the text, in order of appearance."""
+        return list(
+            dict.fromkeys(
+                match.group().lower() for match in self._risk_pattern.finditer(text)
+            )
+        )
+
+    def is_benign(self, text: str) -> bool:
+        return self._benign_pattern.fullmatch(text.strip()) is not None
@@ -1,45 +1,383 @@
+import asyncio
+import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
 import yaml
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models.conversation import ConversationRiskAnalysis
+from src.db.models.conversation import Conversation, ConversationRiskAnalysis
 from src.db.repositories.conversation import ConversationRepository
 from src.db.repositories.conversation_analysis import ConversationRiskAnalysisRepository
-from src.genai.risk_analyzer_clients.base import AIAnalyzerClient
+from src.genai.analysis_cache import AnalysisCache, analysis_cache_key
+from src.genai.pre_screener import PreScreener
+from src.genai.risk_analyzer_clients.base import (
+    AIAnalysis,
+    AIAnalyzerClient,
+    MalformedResponseError,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PLACEHOLDER = "{{conversation_history}}"
+
+BATCH_INSTRUCTIONS = (
+    "\nThe conversation history holds several independent conversations, each after a "
+    "CONVERSATION header with its id. Assess each conversation on its own and respond "
+    'with raw JSON of the form {"results": [{"id": "<conversation id>", ...}]}, one '
+    "result per conversation with the fields of output_format besides the id.\n"
+)
+
+
+class _NothingToAnalyze(NamedTuple):
+    conversation_id: str
+    # returned instead of a new analysis
+    latest: Optional[ConversationRiskAnalysis]
+
+
+class _PreparedAnalysis(NamedTuple):
+    conversation_id: str
+    # analysis whose summary stands for the earlier messages
+    previous: Optional[ConversationRiskAnalysis]
+    transcript: str
+    prompt: str
+    analyzed_version: Optional[int]
+    cache_key: Optional[str] = None
+    cached: Optional[AIAnalysis] = None
+
+
+class PromptTemplate:
+    """Prompt file serialized once around the history slot, reloaded when it changes."""
+
+    def __init__(self, path: str):
+        self._path = path
+        mtime = os.stat(path).st_mtime_ns
+        self._prefix, self._suffix = _compile(_load_config(path))
+        self._mtime = mtime
+
+    def render(self, conversation_history: str) -> str:
+        self._reload_if_changed()
+        return "".join((self._prefix, conversation_history, self._suffix))
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Keeping the loaded prompt, cannot read {self._path}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        # not retried until the file changes again
+        self._mtime = mtime
+        try:
+            self._prefix, self._suffix = _compile(_load_config(self._path))
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f"Keeping the loaded prompt, cannot reload {self._path}: {e}")
+        else:
+            logger.info(f"Reloaded prompt {self._path}")
 
 
 class RiskAnalyzer:
+    """Long-lived analyzer, the prompt is parsed once and sessions are passed per call.
+
+    Each analysis stores a rolling summary, so the next one only sends that summary
+    and the newer messages. Every `full_analysis_every` analyses the whole transcript
+    is read again, so a lossy summary cannot hide risk for long.
+    """
+
     def __init__(
         self,
-        session: AsyncSession,
         ai_client: AIAnalyzerClient,
         prompt_path: str,
+        request_timeout: Optional[float] = None,
+        full_analysis_every: int = 1,
+        cache: Optional[AnalysisCache] = None,
+        pre_screener: Optional[PreScreener] = None,
+        batch_size: int = 1,
+        batch_max_tokens: int = 8000,
     ):
-        self._session = session
         self._ai_client = ai_client
-        self._conversation_repository = ConversationRepository(session)
-        self._conversation_risk_repository = ConversationRiskAnalysisRepository(session)
-        self._prompt = _load_config(prompt_path)
-
-    async def analyze(self, conversation_id: str) -> ConversationRiskAnalysis:
-        conversation = await self._conversation_repository.get(conversation_id)
-        if not conversation:
-            raise ValueError(f"No conversation with id {conversation_id}")
-        formatted_prompt = yaml.dump(self._prompt, allow_unicode=True).replace(
-            "{{conversation_history}}", conversation.to_text()
+        self._request_timeout = request_timeout
+        self._full_analysis_every = full_analysis_every
+        self._cache = cache
+        self._pre_screener = pre_screener
+        self._batch_size = batch_size
+        self._batch_max_tokens = batch_max_tokens
+        self._prompt = PromptTemplate(prompt_path)
+
+    async def analyze(
+        self, session: AsyncSession, conversation_id: str
+    ) -> Optional[ConversationRiskAnalysis]:
+        """Analyze a conversation without holding a transaction during the AI request.
+
+        Returns the latest analysis instead when there is nothing new worth analyzing.
+        """
+        prepared = await self._prepare(session, conversation_id)
+        if isinstance(prepared, _NothingToAnalyze):
+            return prepared.latest
+        ai_analysis = prepared.cached
+        if ai_analysis is None:
+            ai_analysis = await self._ai_client.get_risk_assessment(
+                prompt=prepared.prompt, timeout=self._request_timeout
+            )
+        return await self._save(session, prepared, ai_analysis)
+
+    async def analyze_batch(
+        self, session: AsyncSession, conversation_ids: List[str]
+    ) -> Dict[str, Optional[ConversationRiskAnalysis]]:
+        """Analyze conversations packing several transcripts into each AI request.
+
+        Returns the result of every conversation that did not fail, like `analyze`.
+        """
+        done: Dict[str, Optional[ConversationRiskAnalysis]] = {}
+        to_request = []
+        to_save: List[Tuple[_PreparedAnalysis, AIAnalysis]] = []
+        for conversation_id in conversation_ids:
+            try:
+                prepared = await self._prepare(session, conversation_id)
+            except Exception as e:
+                logger.error(f"Cannot prepare risk analysis for {conversation_id}: {e}")
+                continue
+            if isinstance(prepared, _NothingToAnalyze):
+                done[conversation_id] = prepared.latest
+            elif prepared.cached is not None:
+                to_save.append((prepared, prepared.cached))
+            else:
+                to_request.append(prepared)
+        batches = self._pack(to_request)
+        # requests do not touch the session, only the saves below do
+        responses = await asyncio.gather(
+            *(self._request_batch(batch) for batch in batches)
         )
-        ai_analysis = await self._ai_client.get_risk_assessment(prompt=formatted_prompt)
+        for batch, ai_analyses in zip(batches, responses):
+            for prepared in batch:
+                ai_analysis = ai_analyses.get(prepared.conversation_id)
+                if ai_analysis is not None:
+                    to_save.append((prepared, ai_analysis))
+        for prepared, ai_analysis in to_save:
+            try:
+                done[prepared.conversation_id] = await self._save(
+                    session, prepared, ai_analysis
+                )
+            except Exception as e:
+                logger.error(
+                    f"Cannot save risk analysis for {prepared.conversation_id}: {e}"
+                )
+        return done
+
+    async def _prepare(
+        self, session: AsyncSession, conversation_id: str
+    ) -> Union[_PreparedAnalysis, _NothingToAnalyze]:
+        async with session.begin():
+            latest = await ConversationRiskAnalysisRepository(session).get_latest(
+                conversation_id
+            )
+            previous = latest if self._can_continue(latest) else None
+            # a full analysis reads every message
+            after_version = 0
+            if previous is not None and previous.analyzed_version is not None:
+                after_version = previous.analyzed_version
+            conversation = await ConversationRepository(
+                session
+            ).get_with_messages_after(conversation_id, after_version)
+            if not conversation:
+                raise ValueError(f"No conversation with id {conversation_id}")
+            if previous is not None and not conversation.messages:
+                # nothing was said since the last analysis
+                return _NothingToAnalyze(conversation_id, latest=previous)
+            if (
+                self._pre_screener is not None
+                and not self._pre_screener.should_analyze(
+                    _texts_since(conversation, latest)
+                )
+            ):
+                logger.info(
+                    f"Nothing worth analyzing in conversation {conversation_id}"
+                )
+                return _NothingToAnalyze(conversation_id, latest=latest)
+            transcript = conversation.to_text(
+                summary=previous.summary if previous is not None else None
+            )
+            prompt = self._prompt.render(transcript)
+            cache_key = None
+            cached = None
+            if self._cache is not None:
+                cache_key = analysis_cache_key(self._ai_client.model_id, prompt)
+                cached = await self._cache.get(session, cache_key)
+            return _PreparedAnalysis(
+                conversation_id,
+                previous=previous,
+                transcript=transcript,
+                prompt=prompt,
+                analyzed_version=max(
+                    (message.version for message in conversation.messages),
+                    default=None,
+                ),
+                cache_key=cache_key,
+                cached=cached,
+            )
+
+    async def _save(
+        self,
+        session: AsyncSession,
+        prepared: _PreparedAnalysis,
+        ai_analysis: AIAnalysis,
+    ) -> ConversationRiskAnalysis:
+        previous = prepared.previous
         risk = ConversationRiskAnalysis(
-            conversation_id=conversation_id,
-            analysis=ai_analysis.model_dump(),
+            conversation_id=prepared.conversation_id,
+            analysis=ai_analysis.model_dump(exclude={"summary"}),
             detected_risk=ai_analysis.risk_found or False,
+            analyzed_version=prepared.analyzed_version,
+            summary=ai_analysis.summary,
+            analyses_since_full=(
+                previous.analyses_since_full + 1 if previous is not None else 0
+            ),
         )
-        await self._conversation_risk_repository.save(risk)
+        async with session.begin():
+            await ConversationRiskAnalysisRepository(session).save(risk)
+            if (
+                self._cache is not None
+                and prepared.cache_key is not None
+                and prepared.cached is None
+            ):
+                await self._cache.put(session, prepared.cache_key, ai_analysis)
         return risk
 
+    def _pack(
+        self, to_request: List[_PreparedAnalysis]
+    ) -> List[List[_PreparedAnalysis]]:
+        """Group transcripts into batches within the size and token budgets."""
+        batches: List[List[_PreparedAnalysis]] = []
+        batch: List[_PreparedAnalysis] = []
+        batch_tokens = 0
+        for prepared in to_request:
+            tokens = _estimate_tokens(prepared.transcript)
+            if batch and (
+                len(batch) >= self._batch_size
+                or batch_tokens + tokens > self._batch_max_tokens
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            # a transcript over the budget is sent on its own
+            batch.append(prepared)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _request_batch(
+        self, batch: List[_PreparedAnalysis]
+    ) -> Dict[str, AIAnalysis]:
+        """Assessments by conversation id, missing for conversations that failed."""
+        if len(batch) > 1:
+            # short ids are cheaper and harder for the model to garble than uuids
+            by_result_id = {str(i): prepared for i, prepared in enumerate(batch, 1)}
+            try:
+                ai_analyses = await self._ai_client.get_batch_risk_assessment(
+                    prompt=self._render_batch(by_result_id),
+                    timeout=self._request_timeout,
+                )
+            except MalformedResponseError as e:
+                logger.warning(
+                    f"Falling back to single requests for {len(batch)} conversations: {e}"
+                )
+            except Exception as e:
+                logger.error(
+                    f"Cannot do risk analysis of {len(batch)} conversations: {e}"
+                )
+                return {}
+            else:
+                results = {
+                    prepared.conversation_id: ai_analyses[result_id]
+                    for result_id, prepared in by_result_id.items()
+                    if result_id in ai_analyses
+                }
+                if len(results) == len(batch):
+                    return results
+                logger.warning(
+                    f"Batched response misses {len(batch) - len(results)} conversations, "
+                    "requesting them one by one"
+                )
+                batch = [
+                    prepared
+                    for prepared in batch
+                    if prepared.conversation_id not in results
+                ]
+                return results | await self._request_one_by_one(batch)
+        return await self._request_one_by_one(batch)
+
+    async def _request_one_by_one(
+        self, batch: List[_PreparedAnalysis]
+    ) -> Dict[str, AIAnalysis]:
+        async def request(prepared: _PreparedAnalysis) -> Optional[AIAnalysis]:
+            try:
+                return await self._ai_client.get_risk_assessment(
+                    prompt=prepared.prompt, timeout=self._request_timeout
+                )
+            except Exception as e:
+                logger.error(
+                    f"Cannot do risk analysis for {prepared.conversation_id}: {e}"
+                )
+                return None
+
+        ai_analyses = await asyncio.gather(*(request(prepared) for prepared in batch))
+        return {
+            prepared.conversation_id: ai_analysis
+            for prepared, ai_analysis in zip(batch, ai_analyses)
+            if ai_analysis is not None
+        }
+
+    def _render_batch(self, by_result_id: Dict[str, _PreparedAnalysis]) -> str:
+        # the instructions come last, they override the single result output_format
+        return (
+            self._prompt.render(
+                "".join(
+                    f"=========CONVERSATION {result_id}=========\n{prepared.transcript}\n"
+                    for result_id, prepared in by_result_id.items()
+                )
+            )
+            + BATCH_INSTRUCTIONS
+        )
+
+    def _can_continue(self, previous: Optional[ConversationRiskAnalysis]) -> bool:
+        """Whether the next analysis may build on the previous one's summary."""
+        return (
+            previous is not None
+            and previous.summary is not None
+            and previous.analyzed_version is not None
+            and previous.analyses_since_full + 1 < self._full_analysis_every
+        )
+
+    async def close(self) -> None:
+        await self._ai_client.close()
+
+
+def _estimate_tokens(text: str) -> int:
+    # about four characters per token, close enough to budget a batch
+    return len(text) // 4 + 1
+
+
+def _texts_since(
+    conversation: Conversation, analysis: Optional[ConversationRiskAnalysis]
+) -> List[str]:
+    """Messages the given analysis did not see yet."""
+    if analysis is None or analysis.analyzed_version is None:
+        return [message.text for message in conversation.messages]
+    return [
+        message.text
+        for message in conversation.messages
+        if message.version > analysis.analyzed_version
+    ]
+
+
+def _compile(prompt: dict) -> Tuple[str, str]:
+    prefix, _, suffix = yaml.dump(prompt, allow_unicode=True).partition(
+        HISTORY_PLACEHOLDER
+    )
+    return prefix, suffix
+
 
 def _load_config(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
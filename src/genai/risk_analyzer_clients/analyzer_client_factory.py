@@ -1,17 +1,41 @@
-from enum import Enum
+from typing import Any, Tuple
 
 from src.genai.risk_analyzer_clients.base import AIAnalyzerClient
 from src.genai.risk_analyzer_clients.google_genai import GoogleGenAIClient
+from src.genai.risk_analyzer_clients.local import LocalAnalyzerClient
+from src.genai.risk_analyzer_clients.provider import AnalyzerClientProvider
 
 
-class AnalyzerClientProvider(str, Enum):
-    google_genai = "google_genai"
+# clients own connection pools, so one is shared per provider and configuration
+_clients: dict[
+    Tuple[AnalyzerClientProvider, Tuple[Tuple[str, Any], ...]], AIAnalyzerClient
+] = {}
 
 
 def create_analyzer_client(
     provider: AnalyzerClientProvider, **kwargs
+) -> AIAnalyzerClient:
+    key = (provider, tuple(sorted(kwargs.items())))
+    client = _clients.get(key)
+    if client is None:
+        client = _new_analyzer_client(provider, **kwargs)
+        _clients[key] = client
+    return client
+
+
+async def close_analyzer_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+
+
+def _new_analyzer_client(
+    provider: AnalyzerClientProvider, **kwargs
 ) -> AIAnalyzerClient:
     if provider == AnalyzerClientProvider.google_genai:
         return GoogleGenAIClient(**kwargs)
+    elif provider == AnalyzerClientProvider.local:
+        return LocalAnalyzerClient(**kwargs)
     else:
         raise ValueError(f"Unsupported analyzer client {provider}")
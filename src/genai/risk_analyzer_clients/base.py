@@ -1,10 +1,14 @@
 import asyncio
+import json
 import logging
+import random
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
+from src.shared.circuit_breaker import CircuitBreaker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,34 +16,125 @@ class UnableToAnalyzeError(Exception):
     pass
 
 
+class MalformedResponseError(UnableToAnalyzeError):
+    pass
+
+
 class AIAnalysis(BaseModel):
     risk_found: Optional[bool] = None
     risk_level: Optional[str] = None
     detected_indicators: Optional[List[str]] = None
     clinical_reasoning: Optional[str] = None
     recommended_action: Optional[str] = None
+    # rolling context for the next incremental analysis, not part of the verdict
+    summary: Optional[str] = None
 
 
 class AIAnalyzerClient(ABC):
 
     def __init__(self, **kwargs):
         self._kwargs = kwargs
+        # requests waiting for a slot do not hold a connection
+        self._in_flight = asyncio.Semaphore(self._kwargs.get("max_in_flight", 64))
+        self._backoff_base = self._kwargs.get("backoff_base", 0.5)
+        self._backoff_max = self._kwargs.get("backoff_max", 10)
+        # shared by every analysis using this client
+        self._circuit_breaker = CircuitBreaker(
+            failure_threshold=self._kwargs.get("circuit_breaker_threshold", 5),
+            reset_timeout=self._kwargs.get("circuit_breaker_reset_timeout", 30),
+        )
 
-    async def get_risk_assessment(self, prompt: str, retries: int = 5) -> AIAnalysis:
-        chance = 0
-        wait_for = 3
-        while chance < retries:
+    @property
+    def model_id(self) -> str:
+        """Model answering the requests, its assessments are cached under it."""
+        return self._kwargs.get("model_id", type(self).__name__)
+
+    async def get_risk_assessment(
+        self, prompt: str, retries: int = 5, timeout: Optional[float] = None
+    ) -> AIAnalysis:
+        """Ask for a risk assessment, retrying transient errors until `timeout` seconds passed."""
+        response = await self._generate_within(prompt, retries, timeout)
+        try:
+            return AIAnalysis(**_parse_json(response))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise MalformedResponseError(f"Unexpected risk assessment: {e!r}") from e
+
+    async def get_batch_risk_assessment(
+        self, prompt: str, retries: int = 5, timeout: Optional[float] = None
+    ) -> Dict[str, AIAnalysis]:
+        """Ask for the assessments of several conversations at once, by their ids.
+
+        The response must look like `{"results": [{"id": ..., <assessment>}, ...]}`.
+        """
+        response = await self._generate_within(prompt, retries, timeout)
+        try:
+            return {
+                str(result["id"]): AIAnalysis(
+                    **{key: value for key, value in result.items() if key != "id"}
+                )
+                for result in _parse_json(response)["results"]
+            }
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            raise MalformedResponseError(
+                f"Unexpected batch risk assessment: {e!r}"
+            ) from e
+
+    async def _generate_within(
+        self, prompt: str, retries: int, timeout: Optional[float]
+    ) -> str:
+        try:
+            async with asyncio.timeout(timeout):
+                return await self._generate_with_retries(prompt, retries)
+        except TimeoutError as e:
+            raise UnableToAnalyzeError(
+                f"No risk assessment within {timeout} seconds"
+            ) from e
+
+    async def _generate_with_retries(self, prompt: str, retries: int) -> str:
+        for attempt in range(retries):
+            if not self._circuit_breaker.allow():
+                raise CircuitOpenError("Analyzer provider is failing, not calling it")
             try:
-                return await self._get_risk_assessment(prompt)
+                async with self._in_flight:
+                    response = await self._generate(prompt)
             except Exception as e:
-                logger.error(
-                    f"Failed to get risk assessment for prompt {prompt} due to error {e}"
+                if not self._is_transient(e):
+                    # the provider answered, it just cannot handle this request
+                    self._circuit_breaker.record_success()
+                    raise UnableToAnalyzeError(
+                        f"Failed to get risk assessment: {e!r}"
+                    ) from e
+                self._circuit_breaker.record_failure()
+                logger.warning(
+                    f"Risk assessment attempt {attempt + 1}/{retries} failed: {e!r}"
                 )
-                chance += 1
-            await asyncio.sleep(wait_for)
-            wait_for = wait_for**chance
-        raise UnableToAnalyzeError(f"Failed to get risk assessment for prompt {prompt}")
+            else:
+                self._circuit_breaker.record_success()
+                return response
+            if attempt + 1 < retries:
+                await asyncio.sleep(self._backoff(attempt))
+        raise UnableToAnalyzeError(
+            f"Failed to get risk assessment after {retries} attempts"
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter spreads out retries of analyses that failed together
+        return random.uniform(
+            0, min(self._backoff_max, self._backoff_base * 2**attempt)
+        )
+
+    def _is_transient(self, error: Exception) -> bool:
+        """Whether retrying the same request may succeed."""
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+    async def close(self) -> None:
+        """Release connections held by the client."""
 
     @abstractmethod
-    async def _get_risk_assessment(self, prompt: str) -> AIAnalysis:
-        pass
+    async def _generate(self, prompt: str) -> str:
+        """Send the prompt to the model and return its raw answer."""
+
+
+def _parse_json(response: str) -> Any:
+    # some models send markdown even when requested not to
+    return json.loads(response.replace("```json", "").replace("```", ""))
@@ -1,9 +1,8 @@
-import asyncio
-import json
-
+import httpx
 from google import genai
+from google.genai import errors
 
-from src.genai.risk_analyzer_clients.base import AIAnalyzerClient, AIAnalysis
+from src.genai.risk_analyzer_clients.base import AIAnalyzerClient
 
 
 class GoogleGenAIClient(AIAnalyzerClient):
@@ -12,12 +11,24 @@ class GoogleGenAIClient(AIAnalyzerClient):
         self._client = genai.Client(api_key=self._kwargs["api_key"])
         self._model_id = self._kwargs.get("model_id", "gemini-2.0-flash")
 
-    async def _get_risk_assessment(self, prompt: str) -> AIAnalysis:
-        response = await asyncio.to_thread(
-            self._client.models.generate_content, model=self._model_id, contents=prompt
-        )
+    @property
+    def model_id(self) -> str:
+        return self._model_id
 
-        # some models send markdown even when requested not to
-        text = response.text.replace("```json", "").replace("```", "")
+    def _is_transient(self, error: Exception) -> bool:
+        if isinstance(error, errors.ServerError):
+            return True
+        if isinstance(error, errors.ClientError):
+            # rate limited or timed out on the provider side
+            return error.code in (408, 429)
+        return isinstance(error, httpx.TransportError) or super()._is_transient(error)
 
-        return AIAnalysis(**json.loads(text))
+    async def close(self) -> None:
+        await self._client.aio.aclose()
+        self._client.close()
+
+    async def _generate(self, prompt: str) -> str:
+        response = await self._client.aio.models.generate_content(
+            model=self._model_id, contents=prompt
+        )
+        return response.text
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+from src.genai.pre_screener import LexiconPreScreener
+from src.genai.risk_analyzer_clients.base import AIAnalyzerClient
+
+# transcripts as rendered by Conversation.to_text, the rest of the prompt is not scored
+TRANSCRIPT_PATTERN = re.compile(r"Name: .*?=========END===========", re.DOTALL)
+# batched prompts put each transcript after a header, see RiskAnalyzer._render_batch
+CONVERSATION_PATTERN = re.compile(
+    r"=========CONVERSATION (\S+)=========\n(.*?)(?==========CONVERSATION |\Z)",
+    re.DOTALL,
+)
+
+
+class ThrottledError(Exception):
+    pass
+
+
+class LocalAnalyzerClient(AIAnalyzerClient):
+    """Offline stand-in for an LLM provider, to benchmark and load test the pipeline.
+
+    Assessments are derived from the risk lexicon, so the same transcript always gets
+    the same one. Latencies follow a log-normal distribution, a share of the requests
+    fails with a transient error and requests over the rate limit are throttled.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._latency_median = self._kwargs.get("latency_median", 0.8)
+        self._latency_sigma = self._kwargs.get("latency_sigma", 0.5)
+        self._error_rate = self._kwargs.get("error_rate", 0.0)
+        # requests per second, 0 never throttles
+        self._rate_limit = self._kwargs.get("rate_limit", 0)
+        self._random = random.Random(self._kwargs.get("seed", 0))
+        self._screener = LexiconPreScreener()
+        self._tokens = float(self._rate_limit)
+        self._refilled_at = time.monotonic()
+
+    def _is_transient(self, error: Exception) -> bool:
+        return isinstance(error, ThrottledError) or super()._is_transient(error)
+
+    async def _generate(self, prompt: str) -> str:
+        self._throttle()
+        await asyncio.sleep(
+            self._random.lognormvariate(
+                math.log(self._latency_median), self._latency_sigma
+            )
+        )
+        if self._random.random() < self._error_rate:
+            raise ConnectionError("Simulated provider failure")
+        conversations = CONVERSATION_PATTERN.findall(prompt)
+        if conversations:
+            return json.dumps(
+                {
+                    "results": [
+                        {"id": result_id, **self._assess(transcript)}
+                        for result_id, transcript in conversations
+                    ]
+                }
+            )
+        return json.dumps(self._assess(prompt))
+
+    def _throttle(self) -> None:
+        """Token bucket holding a second worth of requests, like a provider quota."""
+        if self._rate_limit <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(
+            self._rate_limit,
+            self._tokens + (now - self._refilled_at) * self._rate_limit,
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            raise ThrottledError("Simulated rate limit exceeded")
+        self._tokens -= 1
+
+    def _assess(self, text: str) -> dict:
+        transcript = "\n".join(TRANSCRIPT_PATTERN.findall(text))
+        score = self._screener.score(transcript)
+        terms = self._screener.matched_terms(transcript)
+        if score >= 1:
+            risk_level, action = "high", "immediate intervention"
+        elif score >= 0.6:
+            risk_level, action = "medium", "monitoring"
+        elif score > 0:
+            risk_level, action = "low", "monitoring"
+        else:
+            risk_level, action = None, None
+        return {
+            "risk_found": risk_level is not None,
+            "risk_level": risk_level,
+            "detected_indicators": terms,
+            "clinical_reasoning": f"Local assessment with lexicon score {score}.",
+            "recommended_action": action,
+            # the matched terms keep incremental analyses of the summary consistent
+            "summary": f"Mentioned: {', '.join(terms)}." if terms else "Nothing risky.",
+        }
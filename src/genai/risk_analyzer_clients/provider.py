@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class AnalyzerClientProvider(str, Enum):
+    google_genai = "google_genai"
+    # deterministic and offline, for benchmarks and load tests
+    local = "local"
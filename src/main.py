@@ -6,11 +6,13 @@ import uvicorn
 from fastapi import FastAPI
 from starlette.responses import RedirectResponse
 
+from src.api.admin import router as admin_router
 from src.api.conversation import router as conversation_router
-from src.api.dependencies import async_session
 from src.api.user import router as user_router
+from src.db.session import async_session
 from src.outbox_processor import OutboxProcessor
 from src.settings import settings
+from src.shared.outbox_listener import OutboxListener, asyncpg_dsn
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,11 +23,37 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app_: FastAPI):
+    if not settings.run_embedded_outbox_processor:
+        yield
+        return
+
     # Start outbox processor in background
     session = async_session()
-    processor = OutboxProcessor(session)
+    listener = None
+    if settings.outbox_listen_for_notifications:
+        listener = OutboxListener(asyncpg_dsn(settings.db_connection_string))
+    processor = OutboxProcessor(
+        session,
+        listener=listener,
+        analyze_request_timeout=settings.analyze_request_timeout,
+        batch_size=settings.outbox_batch_size,
+        max_concurrent_analyses=settings.outbox_max_concurrent_analyses,
+        job_lease=settings.risk_analysis_job_lease,
+        analysis_max_attempts=settings.risk_analysis_max_attempts,
+        session_factory=async_session,
+        projection_lanes=settings.outbox_projection_lanes,
+        projection_max_batches=settings.outbox_projection_max_batches,
+        max_attempts=settings.outbox_max_attempts,
+        retry_base_delay=settings.outbox_retry_base_delay,
+        retry_max_delay=settings.outbox_retry_max_delay,
+        analysis_quiet_period=settings.risk_analysis_quiet_period,
+        analysis_max_delay=settings.risk_analysis_max_delay,
+        analysis_batch_size=settings.risk_analysis_batch_size,
+    )
     task = asyncio.create_task(
-        processor.process_and_send_to_risk_analyzer(forever=True, interval=5)
+        processor.process_and_send_to_risk_analyzer(
+            forever=True, interval=settings.outbox_poll_interval
+        )
     )
 
     yield
@@ -36,6 +64,9 @@ async def lifespan(app_: FastAPI):
         await task
     except Exception:
         pass
+    await processor.close()
+    if listener is not None:
+        await listener.close()
     await session.aclose()
 
 
@@ -49,6 +80,7 @@ app = FastAPI(
 
 app.include_router(conversation_router, prefix="/api/v1", tags=["conversations"])
 app.include_router(user_router, prefix="/api/v1", tags=["user"])
+app.include_router(admin_router, prefix="/api/v1", tags=["admin"])
 
 
 @app.get("/")
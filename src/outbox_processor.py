@@ -1,104 +1,397 @@
 import asyncio
 import datetime
 import logging
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Optional
+from typing import AsyncContextManager, List, Optional, Tuple
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.db.models.conversation_outbox import ConversationOutbox
 from src.db.models.event import EventType
+from src.db.models.risk_analysis_job import RiskAnalysisJob
 from src.db.repositories.conversation import ConversationRepository
-from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.db.repositories.conversation_outbox import (
+    ConversationOutboxRepository,
+    OutboxCursor,
+)
+from src.db.repositories.risk_analysis_job import RiskAnalysisJobRepository
+from src.genai.analysis_cache import AnalysisCache
+from src.genai.pre_screener import LexiconPreScreener, PreScreenMode
 from src.genai.risk_analyzer import RiskAnalyzer
 from src.genai.risk_analyzer_clients.analyzer_client_factory import (
+    close_analyzer_clients,
     create_analyzer_client,
     AnalyzerClientProvider,
 )
 from src.projector.conversation import ConversationProjector
 from src.settings import settings
+from src.shared.outbox_listener import OutboxListener
 
 
 logger = logging.getLogger(__name__)
 
 
 async def _do_risk_analysis(
-    session: AsyncSession, conversation_id: str, prompt_path: str
-) -> None:
+    risk_analyzer: RiskAnalyzer, session: AsyncSession, conversation_id: str
+) -> Optional[str]:
+    """Analyze a conversation, returning the error when it failed."""
     try:
-        ai_client = create_analyzer_client(
-            AnalyzerClientProvider.google_genai,
-            api_key=settings.google_api_key,
-            model_id="gemini-2.5-flash-lite",
-        )
-        risk_analyzer = RiskAnalyzer(session, ai_client, prompt_path)
-        await risk_analyzer.analyze(conversation_id)
+        await risk_analyzer.analyze(session, conversation_id)
     except Exception as e:
         logger.error(
             f"Cannot do risk analysis for {conversation_id}. Error happened when processing: {e}"
         )
+        return str(e)
     else:
         logger.info(f"Risk analysis done for conversation {conversation_id}")
+        return None
+
+
+def _provider_settings(provider: AnalyzerClientProvider) -> dict:
+    if provider == AnalyzerClientProvider.local:
+        return {
+            "latency_median": settings.local_analyzer_latency_median,
+            "latency_sigma": settings.local_analyzer_latency_sigma,
+            "error_rate": settings.local_analyzer_error_rate,
+            "rate_limit": settings.local_analyzer_rate_limit,
+            "seed": settings.local_analyzer_seed,
+        }
+    return {"api_key": settings.google_api_key, "model_id": "gemini-2.5-flash-lite"}
 
 
 class OutboxProcessor:
     def __init__(
         self,
         session: AsyncSession,
-        analyze_request_timeout: int = 5,
+        analyze_request_timeout: float = 30,
         prompt_path: Optional[str] = None,
+        listener: Optional[OutboxListener] = None,
+        batch_size: int = 500,
+        max_concurrent_analyses: int = 1,
+        job_lease: float = 300,
+        analysis_max_attempts: int = 3,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        projection_lanes: int = 1,
+        max_attempts: int = 10,
+        retry_base_delay: float = 5,
+        retry_max_delay: float = 3600,
+        analysis_quiet_period: float = 0,
+        analysis_max_delay: float = 0,
+        analysis_batch_size: int = 1,
+        projection_max_batches: int = 10,
     ):
         self._session = session
-        self._outbox_repository = ConversationOutboxRepository(session)
-        self._projector = ConversationProjector(session)
+        self._session_factory = session_factory
         self._conversation_repository = ConversationRepository(session)
+        self._job_repository = RiskAnalysisJobRepository(session)
         self._analyze_request_timeout = analyze_request_timeout
+        self._listener = listener
+        self._batch_size = batch_size
+        # a single session cannot be used concurrently, so without a factory
+        # analyses run one at a time on the processor session
+        self._analysis_semaphore = asyncio.Semaphore(
+            max_concurrent_analyses if session_factory is not None else 1
+        )
+        self._job_lease = job_lease
+        self._analysis_max_attempts = analysis_max_attempts
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._analysis_quiet_period = analysis_quiet_period
+        self._analysis_max_delay = analysis_max_delay
+        # conversations packed into one analyzer request, 1 sends each on its own
+        self._analysis_batch_size = analysis_batch_size
+        # lanes need their own sessions
+        self._projection_lanes = projection_lanes if session_factory is not None else 1
+        # projection yields to risk analysis after this many batches per lane,
+        # the next iteration resumes where the lane stopped
+        self._projection_max_batches = projection_max_batches
+        self._lane_cursors: dict[int, Optional[OutboxCursor]] = {}
         self._prompt_path = prompt_path or str(
             Path.cwd() / "prompts" / "risk_analyzer.yaml"
         )
+        self._risk_analyzer: Optional[RiskAnalyzer] = None
         logger.info(f"Using prompt path: {self._prompt_path}")
 
+    async def close(self) -> None:
+        """Release the analyzer client, call it once the processor is done."""
+        self._risk_analyzer = None
+        await close_analyzer_clients()
+
     async def process_and_send_to_risk_analyzer(
-        self, forever: bool = True, interval: int = 5
+        self, forever: bool = True, interval: float = 5
     ) -> None:
         logger.info(f"Starting to process forever={forever} messages")
         if forever:
             while True:
                 logger.info(f"Processing messages...")
+                has_more = False
                 try:
-                    await self._process_and_send_to_risk_analyzer()
+                    has_more = await self._process_and_send_to_risk_analyzer()
                 except Exception as e:
                     logger.error(f"Error happened during outbox processing: {e}")
-                logger.info(f"Will wait for next {interval} seconds")
-                await asyncio.sleep(interval)
+                if not has_more:
+                    await self._wait_for_new_events(interval)
         else:
-            await self._process_and_send_to_risk_analyzer()
+            while await self._process_and_send_to_risk_analyzer():
+                pass
         logger.info("OutboxProcessor exiting...")
 
-    async def _process_and_send_to_risk_analyzer(self) -> None:
-        async with self._session.begin():
-            logger.info("Processing outbox entries...")
-            to_be_analyzed = await self._process()
-            logger.info(
-                f"Outbox processing done. Conversations to be analyzed: {to_be_analyzed}"
+    async def _wait_for_new_events(self, interval: float) -> None:
+        interval = min(interval, await self._seconds_until_next_analysis())
+        if self._listener is None:
+            logger.info(f"Will wait for next {interval} seconds")
+            await asyncio.sleep(interval)
+            return
+        logger.info(f"Will wait for new events for at most {interval} seconds")
+        await self._listener.wait(interval)
+
+    async def _seconds_until_next_analysis(self) -> float:
+        try:
+            async with self._session.begin():
+                run_after = await self._job_repository.next_run_after()
+        except Exception as e:
+            # waiting the whole interval is fine, the loop must survive database hiccups
+            logger.error(f"Cannot look up the next risk analysis: {e}")
+            return float("inf")
+        if run_after is None:
+            return float("inf")
+        now = datetime.datetime.now(datetime.UTC)
+        return max((run_after - now).total_seconds(), 0)
+
+    async def _process_and_send_to_risk_analyzer(self) -> bool:
+        """Project a bounded amount of entries, then analyze.
+
+        Returns whether entries are left to project.
+        """
+        if self._projection_lanes == 1:
+            enqueued, has_more = await self._project_lane(self._session)
+        else:
+            # a failing lane only stalls its own conversations
+            results = await asyncio.gather(
+                *(self._run_lane(lane) for lane in range(self._projection_lanes)),
+                return_exceptions=True,
             )
-            await self._request_risk_analysis(to_be_analyzed)
-
-    async def _request_risk_analysis(self, to_be_analyzed: list[str]) -> None:
-        async with asyncio.TaskGroup() as tg:
-            for conversation_id in to_be_analyzed:
-                # I hope this doesn't have same issue as asyncio.create_task
-                # https://docs.python.org/3/library/asyncio-task.html#asyncio.create_task
-                tg.create_task(
-                    _do_risk_analysis(self._session, conversation_id, self._prompt_path)
+            enqueued = set()
+            has_more = False
+            for lane, result in enumerate(results):
+                if isinstance(result, BaseException):
+                    logger.error(
+                        f"Error happened when projecting lane {lane}: {result}"
+                    )
+                else:
+                    lane_enqueued, lane_has_more = result
+                    enqueued.update(lane_enqueued)
+                    has_more = has_more or lane_has_more
+        logger.info(
+            f"Outbox processing done. Conversations to be analyzed: {list(enqueued)}"
+        )
+        await self._request_risk_analysis()
+        return has_more
+
+    async def _run_lane(self, lane: int) -> Tuple[set[str], bool]:
+        # lanes are only used with a session factory
+        assert self._session_factory is not None
+        async with self._session_factory() as session:
+            return await self._project_lane(session, lane)
+
+    async def _project_lane(
+        self, session: AsyncSession, lane: int = 0
+    ) -> Tuple[set[str], bool]:
+        """Project the entries of the conversations hashing to `lane`, in order.
+
+        Returns the conversations to analyze and whether the lane has entries left.
+        """
+        outbox_repository = ConversationOutboxRepository(session)
+        job_repository = RiskAnalysisJobRepository(session)
+        enqueued: set[str] = set()
+        cursor = self._lane_cursors.pop(lane, None)
+        for _ in range(self._projection_max_batches):
+            # one transaction per batch keeps memory flat and makes progress durable
+            async with session.begin():
+                logger.info(f"Processing outbox entries of lane {lane}...")
+                batch = await outbox_repository.claim_unprocessed(
+                    self._batch_size,
+                    after=cursor,
+                    lane=lane,
+                    lanes=self._projection_lanes,
+                )
+                to_be_analyzed = await self._process(batch.entries, session)
+                # committed together with the projection, so no analysis gets lost
+                await job_repository.enqueue(
+                    to_be_analyzed,
+                    quiet_period=self._analysis_quiet_period,
+                    max_delay=self._analysis_max_delay,
+                )
+                enqueued.update(to_be_analyzed)
+            session.expunge_all()
+            cursor = batch.cursor
+            if cursor is None:
+                break
+        self._lane_cursors[lane] = cursor
+        return enqueued, cursor is not None
+
+    async def _request_risk_analysis(self) -> None:
+        """Drain the risk analysis queue, holding transactions only to claim and complete jobs."""
+        while True:
+            async with self._session.begin():
+                jobs = await self._job_repository.claim(
+                    self._batch_size, lease=self._job_lease
                 )
+            self._session.expunge_all()
+            if not jobs:
+                break
+            async with asyncio.TaskGroup() as tg:
+                if self._analysis_batch_size > 1:
+                    for i in range(0, len(jobs), self._analysis_batch_size):
+                        tg.create_task(
+                            self._do_bounded_batch_risk_analysis(
+                                jobs[i : i + self._analysis_batch_size]
+                            )
+                        )
+                else:
+                    for job in jobs:
+                        # I hope this doesn't have same issue as asyncio.create_task
+                        # https://docs.python.org/3/library/asyncio-task.html#asyncio.create_task
+                        tg.create_task(self._do_bounded_risk_analysis(job))
+            # failed jobs stay leased, so a short batch means the queue is drained
+            if len(jobs) < self._batch_size:
+                break
 
-    async def _process(self) -> list[str]:
-        outboxes = await self._outbox_repository.all_unprocessed()
+    async def _do_bounded_risk_analysis(self, job: RiskAnalysisJob) -> None:
+        try:
+            risk_analyzer = self._get_risk_analyzer()
+        except Exception as e:
+            logger.error(f"Cannot create risk analyzer: {e}")
+            return
+        async with self._analysis_semaphore, self._analysis_session() as session:
+            job_repository = RiskAnalysisJobRepository(session)
+            async with session.begin():
+                if await job_repository.has_pending(job.conversation_id):
+                    # newer messages arrived, the pending job will analyze them all
+                    logger.info(f"Skipping outdated analysis of {job.conversation_id}")
+                    await job_repository.complete(job.id)
+                    return
+            error = await _do_risk_analysis(risk_analyzer, session, job.conversation_id)
+            async with session.begin():
+                if error is None:
+                    await job_repository.complete(job.id)
+                else:
+                    await self._record_job_failure(job_repository, job, error)
+
+    async def _do_bounded_batch_risk_analysis(
+        self, jobs: List[RiskAnalysisJob]
+    ) -> None:
+        try:
+            risk_analyzer = self._get_risk_analyzer()
+        except Exception as e:
+            logger.error(f"Cannot create risk analyzer: {e}")
+            return
+        async with self._analysis_semaphore, self._analysis_session() as session:
+            job_repository = RiskAnalysisJobRepository(session)
+            current = []
+            async with session.begin():
+                for job in jobs:
+                    if await job_repository.has_pending(job.conversation_id):
+                        logger.info(
+                            f"Skipping outdated analysis of {job.conversation_id}"
+                        )
+                        await job_repository.complete(job.id)
+                    else:
+                        current.append(job)
+            try:
+                done = await risk_analyzer.analyze_batch(
+                    session, [job.conversation_id for job in current]
+                )
+            except Exception as e:
+                logger.error(
+                    f"Cannot do risk analysis of {len(current)} conversations: {e}"
+                )
+                done, error = {}, str(e)
+            else:
+                logger.info(f"Risk analysis done for {len(done)} conversations")
+                # the analyzer logged why each of the others failed
+                error = "Batched risk analysis failed"
+            async with session.begin():
+                for job in current:
+                    if job.conversation_id in done:
+                        await job_repository.complete(job.id)
+                    else:
+                        await self._record_job_failure(job_repository, job, error)
+
+    async def _record_job_failure(
+        self,
+        job_repository: RiskAnalysisJobRepository,
+        job: RiskAnalysisJob,
+        error: str,
+    ) -> None:
+        attempts = job.attempts + 1
+        if attempts >= self._analysis_max_attempts:
+            logger.error(
+                f"Giving up on risk analysis of {job.conversation_id} "
+                f"after {attempts} attempts: {error}"
+            )
+            await job_repository.complete(job.id)
+            return
+        # every retry repeats a paid provider call, so they back off
+        delay = self._job_lease * 2 ** (attempts - 1)
+        await job_repository.schedule_retry(
+            job.id,
+            attempts,
+            error,
+            datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=delay),
+        )
+
+    def _get_risk_analyzer(self) -> RiskAnalyzer:
+        if self._risk_analyzer is None:
+            # created on first use and shared by every analysis afterwards
+            self._risk_analyzer = RiskAnalyzer(
+                create_analyzer_client(
+                    settings.analyzer_provider,
+                    max_in_flight=settings.analyzer_max_in_flight,
+                    circuit_breaker_threshold=settings.analyzer_circuit_breaker_threshold,
+                    circuit_breaker_reset_timeout=settings.analyzer_circuit_breaker_reset_timeout,
+                    **_provider_settings(settings.analyzer_provider),
+                ),
+                self._prompt_path,
+                request_timeout=self._analyze_request_timeout,
+                full_analysis_every=settings.risk_analysis_full_analysis_every,
+                batch_size=self._analysis_batch_size,
+                batch_max_tokens=settings.risk_analysis_batch_max_tokens,
+                cache=AnalysisCache(
+                    max_entries=settings.risk_analysis_cache_max_entries,
+                    max_bytes=settings.risk_analysis_cache_max_bytes,
+                    ttl=settings.risk_analysis_cache_ttl,
+                ),
+                pre_screener=LexiconPreScreener(
+                    mode=PreScreenMode(settings.risk_pre_screening_mode),
+                    threshold=settings.risk_pre_screening_threshold,
+                    sample_every=settings.risk_pre_screening_sample_every,
+                ),
+            )
+        return self._risk_analyzer
+
+    def _analysis_session(self) -> AsyncContextManager[AsyncSession]:
+        if self._session_factory is None:
+            return nullcontext(self._session)
+        return self._session_factory()
+
+    async def _process(
+        self,
+        outboxes: Optional[List[ConversationOutbox]] = None,
+        session: Optional[AsyncSession] = None,
+    ) -> list[str]:
+        session = session or self._session
+        projector = ConversationProjector(session)
+        if outboxes is None:
+            outboxes = (
+                await ConversationOutboxRepository(session).claim_unprocessed(
+                    self._batch_size
+                )
+            ).entries
         to_be_analyzed = {}
-        failed_to_be_processed: dict[str, bool] = {}
         for outbox in outboxes:
-            if failed_to_be_processed.get(outbox.event.conversation_id):
-                continue
             if outbox.event.type == EventType.NEW_MESSAGE:
                 to_be_analyzed[outbox.event.conversation_id] = True
             elif (
@@ -106,13 +399,75 @@ class OutboxProcessor:
                 and to_be_analyzed.get(outbox.event.conversation_id)
             ):
                 to_be_analyzed[outbox.event.conversation_id] = False
+        try:
+            async with session.begin_nested():
+                await projector.project_batch(outboxes)
+                await ConversationOutboxRepository(session).mark_processed(
+                    [outbox.id for outbox in outboxes]
+                )
+        except Exception as e:
+            logger.warning(
+                f"Batch projection failed, projecting entries one by one: {e}"
+            )
+            failed = await self._process_one_by_one(outboxes, session, projector)
+        else:
+            failed = set()
+        # failed conversations are analyzed once their entries project on a retry
+        return [
+            conv_id
+            for conv_id, analyze in to_be_analyzed.items()
+            if analyze and conv_id not in failed
+        ]
+
+    async def _process_one_by_one(
+        self,
+        outboxes: List[ConversationOutbox],
+        session: AsyncSession,
+        projector: ConversationProjector,
+    ) -> set[str]:
+        """Project entries in separate savepoints so one bad entry cannot spoil the batch.
+
+        Returns the conversations whose entries failed to project.
+        """
+        outbox_repository = ConversationOutboxRepository(session)
+        processed = []
+        failed_to_be_processed: set[str] = set()
+        for outbox in outboxes:
+            conversation_id = outbox.event.conversation_id
+            if conversation_id in failed_to_be_processed:
+                continue
+            outbox_id, attempts = outbox.id, outbox.attempts + 1
             try:
-                await self._projector.project(outbox)
+                async with session.begin_nested():
+                    await projector.project(outbox)
             except Exception as e:
                 logger.exception(f"Error happened when processing {outbox}: {e}")
-                failed_to_be_processed[outbox.event.conversation_id] = True
+                failed_to_be_processed.add(conversation_id)
+                await self._record_failure(
+                    outbox_repository, outbox_id, attempts, str(e)
+                )
             else:
-                outbox.is_processed = True
-                outbox.updated_at = datetime.datetime.now(datetime.UTC)
-                self._session.add(outbox)
-        return [conv_id for conv_id, analyze in to_be_analyzed.items() if analyze]
+                processed.append(outbox_id)
+        await outbox_repository.mark_processed(processed)
+        return failed_to_be_processed
+
+    async def _record_failure(
+        self,
+        outbox_repository: ConversationOutboxRepository,
+        outbox_id: int,
+        attempts: int,
+        error: str,
+    ) -> None:
+        if attempts >= self._max_attempts:
+            logger.error(
+                f"Giving up on outbox entry {outbox_id} after {attempts} attempts"
+            )
+            await outbox_repository.dead_letter(outbox_id, attempts, error)
+            return
+        delay = min(self._retry_base_delay * 2 ** (attempts - 1), self._retry_max_delay)
+        await outbox_repository.schedule_retry(
+            outbox_id,
+            attempts,
+            error,
+            datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=delay),
+        )
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import re
+from typing import List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.repositories.risk_analysis_cache import RiskAnalysisCacheRepository
+from src.db.session import async_session, engine
+from src.settings import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PATTERN = re.compile(r"^conversation_outbox_p(\d{4})(\d{2})$")
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"conversation_outbox_p{month.year:04d}{month.month:02d}"
+
+
+def _first_day_of_month(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def _next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+class OutboxRetention:
+    """Keeps monthly outbox partitions ahead of time and drops expired ones.
+
+    Dropping a partition is a cheap catalog operation compared to deleting its
+    rows, so processed entries are removed a whole month at a time.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def partitions(self) -> List[str]:
+        results = await self._session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'conversation_outbox'::regclass "
+                "ORDER BY child.relname"
+            )
+        )
+        return [
+            name for name in results.scalars().all() if PARTITION_PATTERN.match(name)
+        ]
+
+    async def create_partitions(
+        self, first_month: datetime.date, last_month: datetime.date
+    ) -> List[str]:
+        """Create the monthly partitions between both months, both included."""
+        created = []
+        existing = set(await self.partitions())
+        month = _first_day_of_month(first_month)
+        while month <= last_month:
+            name = partition_name(month)
+            if name not in existing:
+                try:
+                    async with self._session.begin_nested():
+                        await self._session.execute(
+                            text(
+                                f"CREATE TABLE {name} PARTITION OF conversation_outbox "
+                                f"FOR VALUES FROM ('{month.isoformat()}') "
+                                f"TO ('{_next_month(month).isoformat()}')"
+                            )
+                        )
+                except Exception as e:
+                    # e.g. the default partition already holds rows of that month
+                    logger.error(f"Cannot create outbox partition {name}: {e}")
+                else:
+                    created.append(name)
+            month = _next_month(month)
+        return created
+
+    async def ensure_partitions(
+        self, months_ahead: int, today: Optional[datetime.date] = None
+    ) -> List[str]:
+        month = _first_day_of_month(today or datetime.datetime.now(datetime.UTC).date())
+        last_month = month
+        for _ in range(months_ahead):
+            last_month = _next_month(last_month)
+        return await self.create_partitions(month, last_month)
+
+    async def drop_expired_partitions(
+        self, retention_days: int, today: Optional[datetime.date] = None
+    ) -> List[str]:
+        """Drop partitions older than the retention period once fully processed.
+
+        Partitions still holding unprocessed entries or dead letters are kept.
+        """
+        cutoff = (
+            today or datetime.datetime.now(datetime.UTC).date()
+        ) - datetime.timedelta(days=retention_days)
+        dropped = []
+        for name in await self.partitions():
+            match = PARTITION_PATTERN.match(name)
+            if match is None:
+                logger.warning(f"Skipping partition {name}, it is not a monthly one")
+                continue
+            year, month = match.groups()
+            if _next_month(datetime.date(int(year), int(month), 1)) > cutoff:
+                continue
+            pending = await self._session.execute(
+                text(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE NOT is_processed)")
+            )
+            if pending.scalar():
+                logger.warning(
+                    f"Keeping expired partition {name}, it has pending entries"
+                )
+                continue
+            await self._session.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+        return dropped
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Create upcoming outbox partitions and drop expired ones, "
+        "along with expired cached risk analyses."
+    )
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=settings.outbox_retention_days,
+        help="days processed entries are kept",
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.outbox_partitions_ahead,
+        help="monthly partitions created in advance",
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        async with async_session() as session:
+            retention = OutboxRetention(session)
+            async with session.begin():
+                created = await retention.ensure_partitions(args.months_ahead)
+            async with session.begin():
+                dropped = await retention.drop_expired_partitions(args.retention_days)
+            async with session.begin():
+                expired = await RiskAnalysisCacheRepository(session).delete_expired()
+        logger.info(f"Created outbox partitions {created}, dropped {dropped}")
+        logger.info(f"Deleted {expired} expired cached risk analyses")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
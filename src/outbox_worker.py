@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional, Sequence
+
+from src.db.session import async_session, engine
+from src.outbox_processor import OutboxProcessor
+from src.settings import settings
+from src.shared.outbox_listener import OutboxListener, asyncpg_dsn
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Project outbox events and request conversation risk analyses."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.outbox_batch_size,
+        help="outbox entries claimed per transaction",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.outbox_max_concurrent_analyses,
+        help="risk analyses running at the same time",
+    )
+    parser.add_argument(
+        "--lanes",
+        type=int,
+        default=settings.outbox_projection_lanes,
+        help="conversation lanes projected at the same time",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=settings.outbox_poll_interval,
+        help="seconds between polls when no notification arrives",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="drain the outbox once and exit",
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> None:
+    listener = None
+    if settings.outbox_listen_for_notifications and not args.once:
+        listener = OutboxListener(asyncpg_dsn(settings.db_connection_string))
+    try:
+        async with async_session() as session:
+            processor = OutboxProcessor(
+                session,
+                listener=listener,
+                analyze_request_timeout=settings.analyze_request_timeout,
+                batch_size=args.batch_size,
+                max_concurrent_analyses=args.concurrency,
+                job_lease=settings.risk_analysis_job_lease,
+                analysis_max_attempts=settings.risk_analysis_max_attempts,
+                session_factory=async_session,
+                projection_lanes=args.lanes,
+                projection_max_batches=settings.outbox_projection_max_batches,
+                max_attempts=settings.outbox_max_attempts,
+                retry_base_delay=settings.outbox_retry_base_delay,
+                retry_max_delay=settings.outbox_retry_max_delay,
+                analysis_quiet_period=settings.risk_analysis_quiet_period,
+                analysis_max_delay=settings.risk_analysis_max_delay,
+                analysis_batch_size=settings.risk_analysis_batch_size,
+            )
+            try:
+                await processor.process_and_send_to_risk_analyzer(
+                    forever=not args.once, interval=args.interval
+                )
+            finally:
+                await processor.close()
+    finally:
+        if listener is not None:
+            await listener.close()
+        await engine.dispose()
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> None:
+    task = asyncio.create_task(run(parse_args(argv)))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info("Outbox worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
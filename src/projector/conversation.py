@@ -1,3 +1,6 @@
+import datetime
+from typing import List
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.aggregates.conversation import ConversationStatus
@@ -53,3 +56,45 @@ class ConversationProjector:
             await self._conversation_repository.update(
                 event.conversation_id, status=ConversationStatus.INACTIVE
             )
+
+    async def project_batch(self, conversation_outboxes: List[ConversationOutbox]):
+        """Project consecutive outbox entries with one statement per kind of change.
+
+        Raises on the first failing statement, leaving it to the caller to roll
+        back and project the entries one by one.
+        """
+        now = datetime.datetime.now(datetime.UTC)
+        conversations = []
+        messages = []
+        deleted = []
+        for conversation_outbox in conversation_outboxes:
+            event = conversation_outbox.event
+            # a missing field raises like the failing statements do
+            payload = event.payload or {}
+            if event.type == EventType.CONVERSATION_STARTED:
+                conversations.append(
+                    {
+                        "id": event.conversation_id,
+                        "user_id": payload["user_id"],
+                        "status": ConversationStatus.ACTIVE,
+                        "created_at": now,
+                    }
+                )
+            elif event.type == EventType.NEW_MESSAGE:
+                messages.append(
+                    {
+                        "id": payload["message_id"],
+                        "conversation_id": event.conversation_id,
+                        "text": payload["text"],
+                        "sender": payload["sender"],
+                        "version": event.version,
+                        "created_at": now,
+                    }
+                )
+            elif event.type == EventType.CONVERSATION_DELETED:
+                deleted.append(event.conversation_id)
+        await self._conversation_repository.insert_many(conversations)
+        await self._conversation_messages_repository.insert_many(messages)
+        await self._conversation_repository.update_many(
+            deleted, status=ConversationStatus.INACTIVE
+        )
@@ -1,6 +1,9 @@
 from dotenv import load_dotenv
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
+from src.genai.risk_analyzer_clients.provider import AnalyzerClientProvider
+
 
 load_dotenv()
 
@@ -8,8 +11,81 @@ load_dotenv()
 class Settings(BaseSettings):
     db_connection_string: str
     log_db: bool = False
-    google_api_key: str
+    db_pool_size: int = 10
+    # only needed by the google_genai analyzer provider
+    google_api_key: str = ""
     app_port: int = 8000
+    snapshot_interval: int = 50
+    aggregate_load_mode: str = "state"
+    aggregate_cache_max_entries: int = 10_000
+    aggregate_cache_max_bytes: int = 32 * 1024 * 1024
+    command_conflict_retries: int = 3
+    command_conflict_backoff: float = 0.02
+    outbox_listen_for_notifications: bool = True
+    # with notifications enabled polling is only a safety net
+    outbox_poll_interval: float = 60
+    outbox_batch_size: int = 500
+    # every analysis uses its own session, keep it below the connection pool size
+    outbox_max_concurrent_analyses: int = 8
+    # conversations are spread over lanes projected concurrently, each on its own session
+    outbox_projection_lanes: int = 4
+    # batches a lane projects before queued risk analyses get their turn
+    outbox_projection_max_batches: int = 10
+    # failed entries are retried with exponential backoff, then dead-lettered
+    outbox_max_attempts: int = 10
+    outbox_retry_base_delay: float = 5
+    outbox_retry_max_delay: float = 3600
+    # processed entries are dropped a monthly partition at a time
+    outbox_retention_days: int = 30
+    outbox_partitions_ahead: int = 2
+    # google_genai, or local to benchmark without network access
+    analyzer_provider: AnalyzerClientProvider = AnalyzerClientProvider.google_genai
+    # the local provider answers after a log-normal latency, fails a share of requests
+    # with transient errors and throttles above rate_limit requests per second (0 never)
+    local_analyzer_latency_median: float = 0.8
+    local_analyzer_latency_sigma: float = 0.5
+    local_analyzer_error_rate: float = 0.0
+    local_analyzer_rate_limit: float = 0
+    local_analyzer_seed: int = 0
+    # concurrent requests to the analyzer provider per process
+    analyzer_max_in_flight: int = 64
+    # seconds one analysis may take, retries included
+    analyze_request_timeout: float = 30
+    # consecutive provider failures before failing fast, and for how long
+    analyzer_circuit_breaker_threshold: int = 5
+    analyzer_circuit_breaker_reset_timeout: float = 30
+    # analyze a conversation once it was quiet for a while, but not later than max delay
+    risk_analysis_quiet_period: float = 10
+    risk_analysis_max_delay: float = 60
+    # seconds a claimed risk analysis job is reserved before it is retried
+    risk_analysis_job_lease: int = 300
+    # failed analyses are retried after the lease, doubling each time, then dropped
+    risk_analysis_max_attempts: int = 3
+    # analyses send a rolling summary and new messages, every nth one the whole transcript
+    risk_analysis_full_analysis_every: int = 10
+    # assessments of unchanged prompts are reused instead of calling the provider again
+    risk_analysis_cache_max_entries: int = 10_000
+    risk_analysis_cache_max_bytes: int = 16 * 1024 * 1024
+    risk_analysis_cache_ttl: int = 7 * 24 * 3600
+    # off, threshold or strict: new messages the local pre-screener deems benign skip the analyzer,
+    # though every nth unanalyzed message of a conversation is analyzed anyway
+    risk_pre_screening_mode: str = "off"
+    risk_pre_screening_threshold: float = 0.5
+    risk_pre_screening_sample_every: int = 10
+    # short conversations are packed into one analyzer request, within an estimated token budget
+    risk_analysis_batch_size: int = 1
+    risk_analysis_batch_max_tokens: int = 8000
+    # disable when outbox processing runs in dedicated `src.outbox_worker` processes
+    run_embedded_outbox_processor: bool = True
+
+    @model_validator(mode="after")
+    def _require_provider_credentials(self) -> "Settings":
+        if (
+            self.analyzer_provider == AnalyzerClientProvider.google_genai
+            and not self.google_api_key
+        ):
+            raise ValueError("google_api_key is required by the google_genai provider")
+        return self
 
 
 settings = Settings()
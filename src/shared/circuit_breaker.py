@@ -0,0 +1,62 @@
+import time
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast once a dependency keeps failing, probing it again after a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `allow` rejects calls. Once `reset_timeout` seconds passed the circuit is
+    half-open: `allow` lets a single probe through and rejects the other calls
+    until the probe is recorded. A success closes the circuit, a failure opens
+    it anew. A probe never recorded, say a cancelled call, is given up after
+    another `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the circuit is open or half-open, calls are rejected or probing."""
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = self._clock()
+        if now - self._opened_at < self._reset_timeout:
+            return False
+        if (
+            self._probe_started_at is not None
+            and now - self._probe_started_at < self._reset_timeout
+        ):
+            # a probe is in flight
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            self._opened_at = self._clock()
+            self._probe_started_at = None
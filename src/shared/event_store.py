@@ -1,11 +1,30 @@
-from typing import List
+from typing import List, Optional
 
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.db.models.conversation_head import ConversationHead
+from src.db.models.conversation_snapshot import ConversationSnapshot
 from src.db.models.event import ConversationEvent
 from src.db.models.conversation_outbox import ConversationOutbox
 from src.db.repositories.conversation_event import ConversationEventRepository
+from src.db.repositories.conversation_head import ConversationHeadRepository
 from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.db.repositories.conversation_snapshot import ConversationSnapshotRepository
+from src.shared.outbox_listener import OUTBOX_CHANNEL
+
+
+VERSION_CONSTRAINT = "uq_conversation_id_version"
+
+
+class VersionConflictError(Exception):
+    pass
+
+
+def is_version_conflict(error: IntegrityError) -> bool:
+    """Whether another writer already appended an event with the same version."""
+    return VERSION_CONSTRAINT in str(error.orig)
 
 
 class EventStore:
@@ -13,14 +32,52 @@ class EventStore:
         self._session = session
         self._conversation_event_repository = ConversationEventRepository(session)
         self._outbox_repository = ConversationOutboxRepository(session)
+        self._snapshot_repository = ConversationSnapshotRepository(session)
+        self._head_repository = ConversationHeadRepository(session)
+
+    async def append_event(self, event: ConversationEvent, state: dict) -> None:
+        """Append an event and record the aggregate state it leads to."""
+        await self.append_events([event], state)
 
-    async def append_event(self, event: ConversationEvent) -> None:
-        await self._conversation_event_repository.save(event)
-        await self._outbox_repository.save(
-            ConversationOutbox(event_id=event.id, event=event)
+    async def append_events(self, events: List[ConversationEvent], state: dict) -> None:
+        """Append consecutive events of one conversation in a single bulk insert."""
+        await self._conversation_event_repository.save_all(events)
+        await self._outbox_repository.save_all(
+            [ConversationOutbox(event_id=event.id, event=event) for event in events]
+        )
+        await self._head_repository.upsert(
+            ConversationHead(
+                conversation_id=events[-1].conversation_id,
+                user_id=state["user_id"],
+                status=state["status"],
+                version=state["version"],
+            )
+        )
+        # delivered to listeners only once the transaction commits
+        await self._session.execute(
+            select(func.pg_notify(OUTBOX_CHANNEL, events[-1].conversation_id))
         )
 
-    async def retrieve_events(self, conversation_id: str) -> List[ConversationEvent]:
+    async def retrieve_events(
+        self, conversation_id: str, after_version: int = 0
+    ) -> List[ConversationEvent]:
         return await self._conversation_event_repository.get_all_conversation_events(
-            conversation_id
+            conversation_id, after_version=after_version
+        )
+
+    async def load_head(self, conversation_id: str) -> Optional[ConversationHead]:
+        return await self._head_repository.get_by_conversation(conversation_id)
+
+    async def load_snapshot(
+        self, conversation_id: str
+    ) -> Optional[ConversationSnapshot]:
+        return await self._snapshot_repository.get_latest(conversation_id)
+
+    async def save_snapshot(
+        self, conversation_id: str, version: int, state: dict
+    ) -> None:
+        await self._snapshot_repository.upsert(
+            ConversationSnapshot(
+                conversation_id=conversation_id, version=version, state=state
+            )
         )
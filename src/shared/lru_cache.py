@@ -0,0 +1,61 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def approximate_size(obj: Any) -> int:
+    """Size of an object plus its direct attributes, in bytes."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sum(sys.getsizeof(value) for value in vars(obj).values())
+    return size
+
+
+class LRUCache[K: Hashable, V]:
+    """Least recently used cache bounded by entry count and estimated memory."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        sizeof: Callable[[V], int] = approximate_size,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_in_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        self.evict(key)
+        size = self._sizeof(value)
+        if self._max_entries <= 0 or size > self._max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def evict(self, key: K) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Optional
+
+import asyncpg  # type: ignore[import-untyped]
+from sqlalchemy import make_url
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_CHANNEL = "conversation_outbox"
+
+
+def asyncpg_dsn(connection_string: str) -> str:
+    """Turn a SQLAlchemy connection string into one asyncpg understands."""
+    return (
+        make_url(connection_string)
+        .set(drivername="postgresql")
+        .render_as_string(hide_password=False)
+    )
+
+
+class OutboxListener:
+    """Wakes the outbox processor up as soon as new events are committed."""
+
+    def __init__(self, dsn: str, channel: str = OUTBOX_CHANNEL):
+        self._dsn = dsn
+        self._channel = channel
+        self._connection: Optional[asyncpg.Connection] = None
+        self._notified = asyncio.Event()
+
+    async def start(self) -> None:
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(self._channel, self._on_notification)
+        logger.info(f"Listening for notifications on channel {self._channel}")
+
+    async def close(self) -> None:
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a notification, returning False if the timeout expired first."""
+        await self._ensure_connected()
+        try:
+            await asyncio.wait_for(self._notified.wait(), timeout)
+        except TimeoutError:
+            return False
+        # notifications arriving while the caller processes set the flag again
+        self._notified.clear()
+        return True
+
+    async def _ensure_connected(self) -> None:
+        if self._connection is not None and not self._connection.is_closed():
+            return
+        try:
+            await self.start()
+        except Exception as e:
+            logger.error(f"Cannot listen on channel {self._channel}: {e}")
+        else:
+            # we may have missed notifications while disconnected
+            self._notified.set()
+
+    def _on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        self._notified.set()
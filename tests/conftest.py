@@ -61,6 +61,16 @@ async def db_session(engine):
     await connection.close()
 
 
+@pytest.fixture
+def session_factory(db_session):
+    # sessions joining the test transaction, for code that opens its own sessions
+    return async_sessionmaker(
+        bind=db_session.bind,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+
+
 @pytest.fixture
 def base_url():
     return "http://test"
@@ -0,0 +1,51 @@
+import pytest
+
+from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.outbox_processor import OutboxProcessor
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_and_requeue_dead_letters(
+    db_session, client, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "ghost@vini.com")
+    await OutboxProcessor(db_session, max_attempts=1)._process()
+    await db_session.commit()
+
+    # when
+    response = await client.get("/api/v1/admin/outbox/dead_letters")
+
+    # then
+    assert response.status_code == 200
+    dead_letters = response.json()
+    assert len(dead_letters) == 1
+    assert dead_letters[0]["conversation_id"] == conversation_id
+    assert dead_letters[0]["event_type"] == "new_message"
+    assert dead_letters[0]["version"] == 2
+    assert dead_letters[0]["attempts"] == 1
+
+    # when
+    await db_session.commit()
+    outbox_id = dead_letters[0]["id"]
+    response = await client.post(
+        f"/api/v1/admin/outbox/dead_letters/{outbox_id}/requeue"
+    )
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == {"outbox_id": outbox_id}
+    claimed = await ConversationOutboxRepository(db_session).claim_unprocessed(limit=10)
+    assert [outbox.id for outbox in claimed.entries] == [outbox_id]
+    assert claimed.entries[0].attempts == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_requeue_unknown_dead_letter(client):
+    # when
+    response = await client.post("/api/v1/admin/outbox/dead_letters/0/requeue")
+
+    # then
+    assert response.status_code == 404
@@ -0,0 +1,79 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.db.repositories.risk_analysis_cache import RiskAnalysisCacheRepository
+from src.genai.analysis_cache import AnalysisCache, analysis_cache_key
+from src.genai.risk_analyzer import RiskAnalyzer
+from src.genai.risk_analyzer_clients.base import AIAnalysis
+from src.outbox_processor import OutboxProcessor
+
+
+def test_key_depends_on_model_and_prompt():
+    # given
+    key = analysis_cache_key("gemini", "prompt")
+
+    # then
+    assert key == analysis_cache_key("gemini", "prompt")
+    assert key != analysis_cache_key("other", "prompt")
+    assert key != analysis_cache_key("gemini", "other prompt")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_analysis_is_found_in_postgres_by_another_process(db_session):
+    # given
+    analysis = AIAnalysis(risk_found=True, risk_level="high")
+    await AnalysisCache(max_entries=10, max_bytes=1024 * 1024, ttl=60).put(
+        db_session, "key", analysis
+    )
+
+    # when
+    cached = await AnalysisCache(max_entries=10, max_bytes=1024 * 1024, ttl=60).get(
+        db_session, "key"
+    )
+
+    # then
+    assert cached == analysis
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_expired_analysis_is_ignored_and_deleted(db_session):
+    # given
+    cache = AnalysisCache(max_entries=10, max_bytes=1024 * 1024, ttl=-1)
+    await cache.put(db_session, "key", AIAnalysis(risk_found=False))
+
+    # when
+    cached = await cache.get(db_session, "key")
+    deleted = await RiskAnalysisCacheRepository(db_session).delete_expired()
+
+    # then
+    assert cached is None
+    assert deleted == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_unchanged_transcript_is_not_sent_again(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    await OutboxProcessor(db_session)._process()
+    await db_session.commit()
+    ai_client = Mock(model_id="model")
+    ai_client.get_risk_assessment = AsyncMock(return_value=AIAnalysis(risk_found=False))
+    analyzer = RiskAnalyzer(
+        ai_client,
+        str(Path.cwd() / "prompts" / "risk_analyzer.yaml"),
+        cache=AnalysisCache(max_entries=10, max_bytes=1024 * 1024, ttl=60),
+    )
+
+    # when - replayed
+    first = await analyzer.analyze(db_session, conversation_id)
+    second = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    ai_client.get_risk_assessment.assert_awaited_once()
+    assert second.analysis == first.analysis
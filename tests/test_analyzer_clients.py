@@ -0,0 +1,266 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from google.genai import errors
+from pydantic import ValidationError
+
+from src.genai.risk_analyzer_clients.analyzer_client_factory import (
+    AnalyzerClientProvider,
+    close_analyzer_clients,
+    create_analyzer_client,
+)
+from src.genai.risk_analyzer_clients.base import (
+    MalformedResponseError,
+    UnableToAnalyzeError,
+)
+from src.genai.risk_analyzer_clients.google_genai import GoogleGenAIClient
+from src.settings import Settings
+from src.shared.circuit_breaker import CircuitOpenError
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_clients_are_shared_per_configuration(monkeypatch):
+    # given
+    genai_client = Mock(side_effect=lambda **kwargs: Mock(aio=Mock(aclose=AsyncMock())))
+    monkeypatch.setattr(
+        "src.genai.risk_analyzer_clients.google_genai.genai.Client", genai_client
+    )
+
+    # when
+    first = create_analyzer_client(
+        AnalyzerClientProvider.google_genai, api_key="key", model_id="flash"
+    )
+    second = create_analyzer_client(
+        AnalyzerClientProvider.google_genai, model_id="flash", api_key="key"
+    )
+    other_model = create_analyzer_client(
+        AnalyzerClientProvider.google_genai, api_key="key", model_id="pro"
+    )
+    await close_analyzer_clients()
+
+    # then
+    assert first is second
+    assert first is not other_model
+    assert genai_client.call_count == 2
+    first._client.aio.aclose.assert_awaited_once()
+    other_model._client.aio.aclose.assert_awaited_once()
+    assert (
+        create_analyzer_client(
+            AnalyzerClientProvider.google_genai, api_key="key", model_id="flash"
+        )
+        is not first
+    )
+    await close_analyzer_clients()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_client_caps_requests_in_flight(monkeypatch):
+    # given
+    in_flight = 0
+    max_in_flight = 0
+
+    async def generate_content(model, contents):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return Mock(text='{"risk_found": false}')
+
+    genai_client = Mock(
+        return_value=Mock(aio=Mock(models=Mock(generate_content=generate_content)))
+    )
+    monkeypatch.setattr(
+        "src.genai.risk_analyzer_clients.google_genai.genai.Client", genai_client
+    )
+    client = GoogleGenAIClient(api_key="key", max_in_flight=2)
+
+    # when
+    analyses = await asyncio.gather(
+        *(client.get_risk_assessment(prompt="hi") for _ in range(5))
+    )
+
+    # then
+    assert max_in_flight == 2
+    assert all(analysis.risk_found is False for analysis in analyses)
+
+
+def _client_failing_with(monkeypatch, *responses) -> GoogleGenAIClient:
+    generate_content = AsyncMock(side_effect=responses)
+    monkeypatch.setattr(
+        "src.genai.risk_analyzer_clients.google_genai.genai.Client",
+        Mock(
+            return_value=Mock(aio=Mock(models=Mock(generate_content=generate_content)))
+        ),
+    )
+    return GoogleGenAIClient(api_key="key", backoff_base=0, circuit_breaker_threshold=2)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_transient_errors_are_retried(monkeypatch):
+    # given
+    client = _client_failing_with(
+        monkeypatch,
+        errors.ServerError(503, {}),
+        Mock(text='{"risk_found": true}'),
+    )
+
+    # when
+    analysis = await client.get_risk_assessment(prompt="hi")
+
+    # then
+    assert analysis.risk_found is True
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_other_errors_are_not_retried(monkeypatch):
+    # given
+    client = _client_failing_with(
+        monkeypatch, errors.ClientError(400, {}), Mock(text='{"risk_found": true}')
+    )
+
+    # when/then
+    with pytest.raises(UnableToAnalyzeError):
+        await client.get_risk_assessment(prompt="hi")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_open_circuit_fails_fast(monkeypatch):
+    # given
+    client = _client_failing_with(
+        monkeypatch, *[errors.ServerError(503, {})] * 2, Mock(text="{}")
+    )
+
+    # when/then - the second failure opens the circuit before the third attempt
+    with pytest.raises(CircuitOpenError):
+        await client.get_risk_assessment(prompt="hi")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_risk_assessment_respects_deadline(monkeypatch):
+    # given
+    async def generate_content(model, contents):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(
+        "src.genai.risk_analyzer_clients.google_genai.genai.Client",
+        Mock(
+            return_value=Mock(aio=Mock(models=Mock(generate_content=generate_content)))
+        ),
+    )
+    client = GoogleGenAIClient(api_key="key")
+
+    # when/then
+    with pytest.raises(UnableToAnalyzeError):
+        await client.get_risk_assessment(prompt="hi", timeout=0.05)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_risk_assessment_is_keyed_by_result_id(monkeypatch):
+    # given
+    client = _client_failing_with(
+        monkeypatch,
+        Mock(
+            text='```json{"results": [{"id": 1, "risk_found": true}, '
+            '{"id": "2", "risk_found": false}]}```'
+        ),
+    )
+
+    # when
+    analyses = await client.get_batch_risk_assessment(prompt="hi")
+
+    # then
+    assert {id_: analysis.risk_found for id_, analysis in analyses.items()} == {
+        "1": True,
+        "2": False,
+    }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_malformed_batch_risk_assessment_is_reported(monkeypatch):
+    # given
+    client = _client_failing_with(monkeypatch, Mock(text='[{"risk_found": true}]'))
+
+    # when/then
+    with pytest.raises(MalformedResponseError):
+        await client.get_batch_risk_assessment(prompt="hi")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_local_client_assesses_transcripts_deterministically():
+    # given
+    client = create_analyzer_client(
+        AnalyzerClientProvider.local, latency_median=0.001, latency_sigma=0
+    )
+    risky = "Name: a\n=========BEGIN=============\nText: I want to die\n=========END===========\n"
+    benign = "Name: b\n=========BEGIN=============\nText: ok thanks\n=========END===========\n"
+
+    # when
+    first = await client.get_risk_assessment(prompt=f"about suicide\n{risky}")
+    second = await client.get_risk_assessment(prompt=f"about suicide\n{risky}")
+    batch = await client.get_batch_risk_assessment(
+        prompt=f"=========CONVERSATION 1=========\n{risky}"
+        f"=========CONVERSATION 2=========\n{benign}"
+    )
+    await close_analyzer_clients()
+
+    # then - only the transcript is assessed, not the instructions around it
+    assert first == second
+    assert first.risk_level == "high"
+    assert first.detected_indicators == ["want to die"]
+    assert batch["1"] == first
+    assert batch["2"].risk_found is False
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_local_client_throttles_requests_over_the_rate_limit():
+    # given
+    client = create_analyzer_client(
+        AnalyzerClientProvider.local,
+        latency_median=0.001,
+        latency_sigma=0,
+        rate_limit=1,
+    )
+    await client.get_risk_assessment(prompt="hi")
+
+    # when/then
+    with pytest.raises(UnableToAnalyzeError):
+        await client.get_risk_assessment(prompt="hi", retries=1)
+    await close_analyzer_clients()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_local_client_simulates_transient_failures():
+    # given
+    client = create_analyzer_client(
+        AnalyzerClientProvider.local,
+        latency_median=0.001,
+        latency_sigma=0,
+        error_rate=1,
+        backoff_base=0,
+        circuit_breaker_threshold=10,
+    )
+
+    # when/then
+    with pytest.raises(UnableToAnalyzeError, match="after 3 attempts"):
+        await client.get_risk_assessment(prompt="hi", retries=3)
+    await close_analyzer_clients()
+
+
+def test_google_genai_provider_requires_an_api_key():
+    # when/then
+    with pytest.raises(ValidationError, match="google_api_key"):
+        Settings(
+            db_connection_string="postgresql+asyncpg://localhost/db",
+            analyzer_provider="google_genai",
+            google_api_key="",
+        )
+    assert (
+        Settings(
+            db_connection_string="postgresql+asyncpg://localhost/db",
+            analyzer_provider="local",
+            google_api_key="",
+        ).analyzer_provider
+        == AnalyzerClientProvider.local
+    )
@@ -0,0 +1,179 @@
+from pathlib import Path
+from typing import List
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.db.repositories.risk_analysis_job import RiskAnalysisJobRepository
+from src.genai.risk_analyzer import RiskAnalyzer
+from src.genai.risk_analyzer_clients.base import AIAnalysis, MalformedResponseError
+from src.outbox_processor import OutboxProcessor
+
+
+@pytest.fixture
+def create_conversations(db_session, create_user, create_conversation, create_message):
+    async def _create_conversations(count: int) -> List[str]:
+        user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+        conversation_ids = []
+        for i in range(count):
+            conversation_id = (await create_conversation(user_id))["conversation_id"]
+            await create_message(
+                user_id, conversation_id, f"message {i}", "vini@vini.com"
+            )
+            conversation_ids.append(conversation_id)
+        await OutboxProcessor(db_session)._process()
+        await db_session.commit()
+        return conversation_ids
+
+    return _create_conversations
+
+
+def _analyzer(ai_client: Mock, **kwargs) -> RiskAnalyzer:
+    return RiskAnalyzer(
+        ai_client, str(Path.cwd() / "prompts" / "risk_analyzer.yaml"), **kwargs
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_conversations_are_analyzed_in_one_request(
+    db_session, create_conversations
+):
+    # given
+    conversation_ids = await create_conversations(2)
+    ai_client = Mock(model_id="model")
+    ai_client.get_batch_risk_assessment = AsyncMock(
+        return_value={
+            "1": AIAnalysis(risk_found=True),
+            "2": AIAnalysis(risk_found=False),
+        }
+    )
+    ai_client.get_risk_assessment = AsyncMock()
+    analyzer = _analyzer(ai_client, batch_size=10)
+
+    # when
+    done = await analyzer.analyze_batch(db_session, conversation_ids)
+
+    # then
+    ai_client.get_batch_risk_assessment.assert_awaited_once()
+    ai_client.get_risk_assessment.assert_not_awaited()
+    prompt = ai_client.get_batch_risk_assessment.await_args.kwargs["prompt"]
+    assert "CONVERSATION 1" in prompt and "CONVERSATION 2" in prompt
+    assert [done[id_].detected_risk for id_ in conversation_ids] == [True, False]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batches_respect_the_token_budget(db_session, create_conversations):
+    # given
+    conversation_ids = await create_conversations(3)
+    ai_client = Mock(model_id="model")
+    ai_client.get_batch_risk_assessment = AsyncMock()
+    ai_client.get_risk_assessment = AsyncMock(return_value=AIAnalysis())
+    analyzer = _analyzer(ai_client, batch_size=10, batch_max_tokens=1)
+
+    # when
+    done = await analyzer.analyze_batch(db_session, conversation_ids)
+
+    # then
+    ai_client.get_batch_risk_assessment.assert_not_awaited()
+    assert ai_client.get_risk_assessment.await_count == 3
+    assert set(done) == set(conversation_ids)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_malformed_batch_falls_back_to_single_requests(
+    db_session, create_conversations
+):
+    # given
+    conversation_ids = await create_conversations(2)
+    ai_client = Mock(model_id="model")
+    ai_client.get_batch_risk_assessment = AsyncMock(
+        side_effect=MalformedResponseError("not json")
+    )
+    ai_client.get_risk_assessment = AsyncMock(return_value=AIAnalysis(risk_found=False))
+    analyzer = _analyzer(ai_client, batch_size=10)
+
+    # when
+    done = await analyzer.analyze_batch(db_session, conversation_ids)
+
+    # then
+    assert ai_client.get_risk_assessment.await_count == 2
+    assert set(done) == set(conversation_ids)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_missing_results_are_requested_one_by_one(
+    db_session, create_conversations
+):
+    # given
+    conversation_ids = await create_conversations(2)
+    ai_client = Mock(model_id="model")
+    ai_client.get_batch_risk_assessment = AsyncMock(
+        return_value={"1": AIAnalysis(risk_found=True)}
+    )
+    ai_client.get_risk_assessment = AsyncMock(return_value=AIAnalysis(risk_found=False))
+    analyzer = _analyzer(ai_client, batch_size=10)
+
+    # when
+    done = await analyzer.analyze_batch(db_session, conversation_ids)
+
+    # then
+    ai_client.get_risk_assessment.assert_awaited_once()
+    assert [done[id_].detected_risk for id_ in conversation_ids] == [True, False]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failing_save_does_not_lose_the_other_results(
+    db_session, create_conversations, monkeypatch
+):
+    # given
+    conversation_ids = await create_conversations(2)
+    ai_client = Mock(model_id="model")
+    ai_client.get_batch_risk_assessment = AsyncMock(
+        return_value={
+            "1": AIAnalysis(risk_found=True),
+            "2": AIAnalysis(risk_found=False),
+        }
+    )
+    analyzer = _analyzer(ai_client, batch_size=10)
+    save = analyzer._save
+
+    async def failing_save(session, prepared, ai_analysis):
+        if prepared.conversation_id == conversation_ids[0]:
+            raise ConnectionError("connection lost")
+        return await save(session, prepared, ai_analysis)
+
+    monkeypatch.setattr(analyzer, "_save", failing_save)
+
+    # when
+    done = await analyzer.analyze_batch(db_session, conversation_ids)
+
+    # then
+    assert list(done) == [conversation_ids[1]]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_processor_completes_jobs_of_analyzed_batches(db_session, monkeypatch):
+    # given
+    job_repository = RiskAnalysisJobRepository(db_session)
+    await job_repository.enqueue(["a", "b", "c"])
+    await db_session.commit()
+    risk_analyzer = Mock()
+    risk_analyzer.analyze_batch = AsyncMock(
+        side_effect=lambda session, ids: {id_: None for id_ in ids if id_ != "c"}
+    )
+    processor = OutboxProcessor(db_session, analysis_batch_size=2)
+    monkeypatch.setattr(processor, "_get_risk_analyzer", lambda: risk_analyzer)
+
+    # when
+    await processor._request_risk_analysis()
+    await processor.close()
+
+    # then - the failed one stays leased until its retry
+    assert [call.args[1] for call in risk_analyzer.analyze_batch.await_args_list] == [
+        ["a", "b"],
+        ["c"],
+    ]
+    jobs = await job_repository.all()
+    assert [job.conversation_id for job in jobs] == ["c"]
+    assert jobs[0].locked_until is not None
+    assert jobs[0].attempts == 1
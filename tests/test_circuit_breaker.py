@@ -0,0 +1,79 @@
+from src.shared.circuit_breaker import CircuitBreaker
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        # given
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: 0)
+
+        # when
+        breaker.record_failure()
+        allowed_after_one_failure = breaker.allow()
+        breaker.record_failure()
+
+        # then
+        assert allowed_after_one_failure
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self):
+        # given
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: 0)
+
+        # when
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        # then
+        assert breaker.allow()
+
+    def test_probes_again_after_reset_timeout(self):
+        # given
+        now = 0.0
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now
+        )
+        breaker.record_failure()
+
+        # when
+        now = 10.0
+
+        # then - a single probe is let through, a failing one opens the circuit again
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+    def test_successful_probe_closes_the_circuit(self):
+        # given
+        now = 0.0
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now
+        )
+        breaker.record_failure()
+        now = 10.0
+        breaker.allow()
+
+        # when
+        breaker.record_success()
+
+        # then
+        assert breaker.allow()
+        assert breaker.allow()
+        assert not breaker.is_open
+
+    def test_gives_up_on_a_probe_never_recorded(self):
+        # given
+        now = 0.0
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now
+        )
+        breaker.record_failure()
+        now = 10.0
+        breaker.allow()
+
+        # when
+        now = 20.0
+
+        # then
+        assert breaker.allow()
@@ -1,9 +1,15 @@
 import pytest
 
-from src.api.schemas.conversation import SendMessageRequest
+from src.aggregates.conversation import ConversationAggregate, ConversationStatus
+from src.api.schemas.conversation import SendMessageRequest, SendMessagesBatchRequest
+from src.command.conversation import AggregateLoadMode, ConversationCommandHandler
 from src.db.models.event import EventType
 from src.db.repositories.conversation_event import ConversationEventRepository
+from src.db.repositories.conversation_head import ConversationHeadRepository
 from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.db.repositories.conversation_snapshot import ConversationSnapshotRepository
+from src.shared.event_store import VersionConflictError
+from src.shared.lru_cache import LRUCache
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -80,6 +86,76 @@ async def test_send_new_message(db_session, client, create_user, create_conversa
     assert outbox[-1].updated_at is None
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_send_messages_batch(
+    db_session, client, create_user, create_conversation
+):
+    # given
+    conversation_event_repository = ConversationEventRepository(db_session)
+    outbox_repository = ConversationOutboxRepository(db_session)
+    head_repository = ConversationHeadRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+
+    # when
+    payload = SendMessagesBatchRequest(
+        messages=[
+            SendMessageRequest(text="hello", sender="vini"),
+            SendMessageRequest(text="how are you?", sender="vini"),
+            SendMessageRequest(text="fine", sender="ai"),
+        ]
+    )
+    response = await client.post(
+        f"/api/v1/{user_id}/conversations/{conversation_id}/messages:batch",
+        json=payload.model_dump(),
+    )
+
+    # then
+    assert response.status_code == 201
+    message_ids = response.json()["message_ids"]
+    assert len(message_ids) == 3
+    events = await conversation_event_repository.get_all_conversation_events(
+        conversation_id
+    )
+    assert [event.version for event in events] == [1, 2, 3, 4]
+    assert [event.payload for event in events[1:]] == [
+        {"text": "hello", "sender": "vini", "message_id": message_ids[0]},
+        {"text": "how are you?", "sender": "vini", "message_id": message_ids[1]},
+        {"text": "fine", "sender": "ai", "message_id": message_ids[2]},
+    ]
+    outbox = await outbox_repository.all()
+    assert len(outbox) == 4
+    head = await head_repository.get_by_conversation(conversation_id)
+    assert head.version == 4
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_send_messages_batch_to_conversation_of_another_user(
+    db_session, client, create_user, create_conversation
+):
+    # given
+    conversation_event_repository = ConversationEventRepository(db_session)
+    owner_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    other_id = (await create_user("other", "other@other.com"))["user_id"]
+    conversation_id = (await create_conversation(owner_id))["conversation_id"]
+
+    # when
+    payload = SendMessagesBatchRequest(
+        messages=[SendMessageRequest(text="hello", sender="other")]
+    )
+    response = await client.post(
+        f"/api/v1/{other_id}/conversations/{conversation_id}/messages:batch",
+        json=payload.model_dump(),
+    )
+
+    # then
+    assert response.status_code == 500
+    events = await conversation_event_repository.get_all_conversation_events(
+        conversation_id
+    )
+    assert len(events) == 1
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_delete_conversation(
     db_session, client, create_user, create_conversation, create_message
@@ -113,3 +189,153 @@ async def test_delete_conversation(
     assert outbox[-1].is_processed is False
     assert outbox[-1].created_at is not None
     assert outbox[-1].updated_at is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_snapshot_is_taken_every_interval(db_session, create_user):
+    # given
+    conversation_event_repository = ConversationEventRepository(db_session)
+    snapshot_repository = ConversationSnapshotRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    command_handler = ConversationCommandHandler(db_session, snapshot_interval=2)
+    conversation_id = await command_handler.start_conversation(user_id)
+
+    # when
+    for text in ("hi", "how are you?", "fine"):
+        await command_handler.new_message(user_id, conversation_id, text, "vini")
+    # the aggregate is now rebuilt from the snapshot plus the remaining tail
+    await command_handler.delete_conversation(user_id, conversation_id)
+
+    # then
+    snapshot = await snapshot_repository.get_latest(conversation_id)
+    assert snapshot is not None
+    assert snapshot.version == 4
+    assert snapshot.state == {
+        "user_id": user_id,
+        "version": 4,
+        "status": ConversationStatus.ACTIVE.value,
+    }
+    events = await conversation_event_repository.get_all_conversation_events(
+        conversation_id
+    )
+    assert [event.version for event in events] == [1, 2, 3, 4, 5]
+    assert events[-1].type == EventType.CONVERSATION_DELETED
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cached_aggregate_catches_up_with_newer_events(db_session, create_user):
+    # given
+    conversation_event_repository = ConversationEventRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    cache: LRUCache[str, ConversationAggregate] = LRUCache(
+        max_entries=10, max_bytes=1024 * 1024
+    )
+    cached_handler = ConversationCommandHandler(db_session, aggregate_cache=cache)
+    conversation_id = await cached_handler.start_conversation(user_id)
+    # another replica appends events the cache has not seen
+    await ConversationCommandHandler(db_session).new_message(
+        user_id, conversation_id, "hi", "vini"
+    )
+
+    # when
+    await cached_handler.new_message(user_id, conversation_id, "hello", "vini")
+
+    # then
+    events = await conversation_event_repository.get_all_conversation_events(
+        conversation_id
+    )
+    assert [event.version for event in events] == [1, 2, 3]
+    cached = cache.get(conversation_id)
+    assert cached is not None
+    assert cached.version == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_head_follows_appended_events(db_session, create_user):
+    # given
+    head_repository = ConversationHeadRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    command_handler = ConversationCommandHandler(db_session)
+    conversation_id = await command_handler.start_conversation(user_id)
+
+    # when
+    await command_handler.new_message(user_id, conversation_id, "hi", "vini")
+    await command_handler.delete_conversation(user_id, conversation_id)
+
+    # then
+    head = await head_repository.get_by_conversation(conversation_id)
+    assert head is not None
+    assert head.user_id == user_id
+    assert head.version == 3
+    assert head.status == ConversationStatus.INACTIVE.value
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_state_mode_validates_against_head(db_session, create_user):
+    # given
+    head_repository = ConversationHeadRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = await ConversationCommandHandler(db_session).start_conversation(
+        user_id
+    )
+    async with db_session.begin():
+        head = await head_repository.get_by_conversation(conversation_id)
+        head.status = ConversationStatus.INACTIVE.value
+
+    # when/then - the head is the source of truth in state mode
+    with pytest.raises(ValueError, match="Cannot add message to conversation"):
+        await ConversationCommandHandler(
+            db_session, load_mode=AggregateLoadMode.STATE
+        ).new_message(user_id, conversation_id, "hi", "vini")
+
+    # when/then - replay mode rebuilds the state from the events
+    await ConversationCommandHandler(
+        db_session, load_mode=AggregateLoadMode.REPLAY
+    ).new_message(user_id, conversation_id, "hi", "vini")
+
+
+async def _make_head_stale(db_session, conversation_id: str) -> None:
+    """Simulate a concurrent writer appending right after our head read."""
+    async with db_session.begin():
+        head = await ConversationHeadRepository(db_session).get_by_conversation(
+            conversation_id
+        )
+        assert head is not None
+        head.version -= 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_version_conflict_is_retried_with_missing_events(db_session, create_user):
+    # given
+    conversation_event_repository = ConversationEventRepository(db_session)
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    command_handler = ConversationCommandHandler(db_session, conflict_backoff=0)
+    conversation_id = await command_handler.start_conversation(user_id)
+    await command_handler.new_message(user_id, conversation_id, "hi", "vini")
+    await _make_head_stale(db_session, conversation_id)
+
+    # when
+    await command_handler.new_message(user_id, conversation_id, "hello", "vini")
+
+    # then
+    events = await conversation_event_repository.get_all_conversation_events(
+        conversation_id
+    )
+    assert [event.version for event in events] == [1, 2, 3]
+    assert events[-1].payload["text"] == "hello"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_version_conflict_gives_up_after_max_retries(db_session, create_user):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    command_handler = ConversationCommandHandler(
+        db_session, max_conflict_retries=0, conflict_backoff=0
+    )
+    conversation_id = await command_handler.start_conversation(user_id)
+    await command_handler.new_message(user_id, conversation_id, "hi", "vini")
+    await _make_head_stale(db_session, conversation_id)
+
+    # when/then
+    with pytest.raises(VersionConflictError):
+        await command_handler.new_message(user_id, conversation_id, "hello", "vini")
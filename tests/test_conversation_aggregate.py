@@ -315,3 +315,37 @@ class TestConversationAggregate:
 
         with pytest.raises(ValueError, match="Unknown event type"):
             aggregate.apply(event)
+
+    def test_snapshot_round_trip(self):
+        # given
+        conversation_id = str(uuid4())
+        user_id = str(uuid4())
+        aggregate = ConversationAggregate(conversation_id, user_id)
+        aggregate.apply(
+            ConversationEvent(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                type=EventType.CONVERSATION_STARTED,
+                payload={"user_id": user_id},
+                version=1,
+            )
+        )
+
+        # when
+        restored = ConversationAggregate.from_snapshot(
+            conversation_id, aggregate.to_snapshot()
+        )
+
+        # then
+        assert restored.status == ConversationStatus.ACTIVE
+        assert restored.version == 1
+        with pytest.raises(ValueError, match="cannot add message to conversation"):
+            restored.apply(
+                ConversationEvent(
+                    conversation_id=conversation_id,
+                    user_id=str(uuid4()),
+                    type=EventType.NEW_MESSAGE,
+                    payload={"text": "Hello", "sender": "x", "message_id": "1"},
+                    version=2,
+                )
+            )
@@ -0,0 +1,57 @@
+from src.shared.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used_entry(self):
+        # given
+        cache: LRUCache[str, int] = LRUCache(
+            max_entries=2, max_bytes=1024, sizeof=lambda _: 1
+        )
+        cache.put("a", 1)
+        cache.put("b", 2)
+
+        # when
+        cache.get("a")
+        cache.put("c", 3)
+
+        # then
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_evicts_until_memory_bound_is_respected(self):
+        # given
+        cache: LRUCache[str, str] = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "yyyy")
+
+        # when
+        cache.put("c", "zzzz")
+
+        # then
+        assert len(cache) == 2
+        assert cache.size_in_bytes == 8
+        assert cache.get("a") is None
+
+    def test_does_not_store_values_bigger_than_memory_bound(self):
+        # given
+        cache: LRUCache[str, str] = LRUCache(max_entries=10, max_bytes=3, sizeof=len)
+
+        # when
+        cache.put("a", "xxxx")
+
+        # then
+        assert cache.get("a") is None
+        assert cache.size_in_bytes == 0
+
+    def test_evict(self):
+        # given
+        cache: LRUCache[str, int] = LRUCache(max_entries=10, max_bytes=1024)
+        cache.put("a", 1)
+
+        # when
+        cache.evict("a")
+
+        # then
+        assert cache.get("a") is None
+        assert cache.size_in_bytes == 0
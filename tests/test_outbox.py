@@ -1,16 +1,22 @@
 import asyncio
+import datetime
 import json
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
 import pytest
+from sqlalchemy import text
 
 from src.aggregates.conversation import ConversationStatus
 from src.db.repositories.conversation import ConversationRepository
 from src.db.repositories.conversation_analysis import ConversationRiskAnalysisRepository
 from src.db.repositories.conversation_message import ConversationMessageRepository
 from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.db.repositories.risk_analysis_job import RiskAnalysisJobRepository
+from src.genai.risk_analyzer import RiskAnalyzer
+from src.genai.risk_analyzer_clients.base import AIAnalysis
 from src.outbox_processor import OutboxProcessor
+from src.shared.outbox_listener import OUTBOX_CHANNEL, OutboxListener, asyncpg_dsn
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -60,6 +66,230 @@ async def test_outbox_process_and_project(
     assert message.created_at is not None
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_projects_batch_with_deleted_conversation(
+    db_session, client, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    await client.delete(f"/api/v1/{user_id}/conversations/{conversation_id}")
+    processor = OutboxProcessor(db_session)
+
+    # when
+    conversations = await processor._process()
+
+    # then
+    outboxes = await ConversationOutboxRepository(db_session).all()
+    assert len(outboxes) == 3
+    assert all(outbox.is_processed for outbox in outboxes)
+    assert conversations == []
+    conversation = await ConversationRepository(db_session).get(conversation_id)
+    assert conversation.status == ConversationStatus.INACTIVE
+    assert [message.text for message in conversation.messages] == ["hi"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_falls_back_to_single_entries_when_batch_fails(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    healthy_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, healthy_id, "hi", "vini@vini.com")
+    broken_id = (await create_conversation(user_id))["conversation_id"]
+    # the sender is not a known user, so the message cannot be projected
+    await create_message(user_id, broken_id, "hi", "ghost@vini.com")
+    processor = OutboxProcessor(db_session)
+
+    # when
+    to_be_analyzed = await processor._process()
+
+    # then
+    assert to_be_analyzed == [healthy_id]
+    outboxes = await ConversationOutboxRepository(db_session).all()
+    unprocessed = [outbox for outbox in outboxes if not outbox.is_processed]
+    assert [
+        (outbox.event.conversation_id, outbox.event.version) for outbox in unprocessed
+    ] == [(broken_id, 2)]
+    messages = await ConversationMessageRepository(db_session).all()
+    assert [message.conversation_id for message in messages] == [healthy_id]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_retries_failed_entry_then_dead_letters_it(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "ghost@vini.com")
+    await create_message(user_id, conversation_id, "hello", "vini@vini.com")
+    outbox_repository = ConversationOutboxRepository(db_session)
+    processor = OutboxProcessor(db_session, max_attempts=2, retry_base_delay=60)
+
+    # when
+    await processor._process()
+
+    # then - the failed entry waits for its retry and holds back the next one
+    failed = (await outbox_repository.all())[1]
+    assert failed.attempts == 1
+    assert "ghost@vini.com" in failed.last_error
+    assert failed.next_attempt_at is not None
+    assert (await outbox_repository.claim_unprocessed(limit=10)).entries == []
+
+    # when - the retry is due and fails again
+    await outbox_repository.update(failed.id, next_attempt_at=None)
+    await processor._process()
+
+    # then - it is dead-lettered and no longer blocks the conversation
+    dead_letters = await outbox_repository.dead_letters()
+    assert [outbox.id for outbox in dead_letters] == [failed.id]
+    assert dead_letters[0].attempts == 2
+    claimed = await outbox_repository.claim_unprocessed(limit=10)
+    assert [outbox.event.version for outbox in claimed.entries] == [3]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_claims_entries_in_bounded_batches(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    await create_message(user_id, conversation_id, "hello", "vini@vini.com")
+    outbox_repository = ConversationOutboxRepository(db_session)
+    processor = OutboxProcessor(db_session, batch_size=2)
+
+    # when
+    first = await outbox_repository.claim_unprocessed(limit=2)
+    await processor._process(first.entries)
+    second = await outbox_repository.claim_unprocessed(limit=2, after=first.cursor)
+    await processor._process(second.entries)
+    third = await outbox_repository.claim_unprocessed(limit=2, after=second.cursor)
+
+    # then
+    assert [outbox.event.version for outbox in first.entries] == [1, 2]
+    assert [outbox.event.version for outbox in second.entries] == [3]
+    assert third.entries == []
+    assert third.cursor is None
+    message_repository = ConversationMessageRepository(db_session)
+    messages = await message_repository.all()
+    assert sorted(message.version for message in messages) == [2, 3]
+    outboxes = await outbox_repository.all()
+    assert all(outbox.is_processed for outbox in outboxes)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_yields_to_risk_analysis_after_max_batches(
+    db_session, create_user, create_conversation, create_message, monkeypatch
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    await db_session.commit()
+    processor = OutboxProcessor(db_session, batch_size=1, projection_max_batches=1)
+    request_risk_analysis = AsyncMock()
+    monkeypatch.setattr(processor, "_request_risk_analysis", request_risk_analysis)
+
+    # when
+    first = await processor._process_and_send_to_risk_analyzer()
+    second = await processor._process_and_send_to_risk_analyzer()
+    third = await processor._process_and_send_to_risk_analyzer()
+
+    # then - analysis ran after every bounded round of projection
+    assert (first, second, third) == (True, True, False)
+    assert request_risk_analysis.await_count == 3
+    outboxes = await ConversationOutboxRepository(db_session).all()
+    assert all(outbox.is_processed for outbox in outboxes)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_keeps_conversation_order_after_failure(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    outbox_repository = ConversationOutboxRepository(db_session)
+    first = await outbox_repository.claim_unprocessed(limit=1)
+
+    # when - the first entry was not processed
+    second = await outbox_repository.claim_unprocessed(limit=1, after=first.cursor)
+
+    # then - the later entry of the same conversation is held back
+    assert [outbox.event.version for outbox in first.entries] == [1]
+    assert second.entries == []
+    assert second.cursor is not None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_lanes_split_conversations(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_ids = set()
+    for _ in range(6):
+        conversation_id = (await create_conversation(user_id))["conversation_id"]
+        await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+        conversation_ids.add(conversation_id)
+    outbox_repository = ConversationOutboxRepository(db_session)
+
+    # when
+    lanes = [
+        await outbox_repository.claim_unprocessed(limit=100, lane=lane, lanes=3)
+        for lane in range(3)
+    ]
+
+    # then - every conversation is claimed by exactly one lane, in version order
+    claimed = [
+        {outbox.event.conversation_id for outbox in lane.entries} for lane in lanes
+    ]
+    assert set().union(*claimed) == conversation_ids
+    assert sum(len(conversations) for conversations in claimed) == 6
+    for lane in lanes:
+        versions: dict[str, list[int]] = {}
+        for outbox in lane.entries:
+            versions.setdefault(outbox.event.conversation_id, []).append(
+                outbox.event.version
+            )
+        assert all(version == [1, 2] for version in versions.values())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failing_lane_does_not_cancel_the_others(
+    db_session, session_factory, monkeypatch
+):
+    # given
+    processor = OutboxProcessor(
+        db_session, session_factory=session_factory, projection_lanes=3
+    )
+    finished = []
+
+    async def run_lane(lane):
+        if lane == 1:
+            raise ConnectionError("connection lost")
+        await asyncio.sleep(0.05)
+        finished.append(lane)
+        return {f"conversation-{lane}"}, False
+
+    monkeypatch.setattr(processor, "_run_lane", run_lane)
+    request_risk_analysis = AsyncMock()
+    monkeypatch.setattr(processor, "_request_risk_analysis", request_risk_analysis)
+
+    # when
+    await processor._process_and_send_to_risk_analyzer()
+
+    # then
+    assert sorted(finished) == [0, 2]
+    request_risk_analysis.assert_awaited_once()
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_outbox_process_and_project_and_request_risk_analysis(
     db_session, create_user, create_conversation, create_message, monkeypatch
@@ -81,7 +311,8 @@ async def test_outbox_process_and_project_and_request_risk_analysis(
      }
     """
     mock = Mock()
-    mock.models.generate_content.return_value = Mock(text=analysis)
+    mock.aio.models.generate_content = AsyncMock(return_value=Mock(text=analysis))
+    mock.aio.aclose = AsyncMock()
     genai_client = Mock(return_value=mock)
     monkeypatch.setattr(
         "src.genai.risk_analyzer_clients.google_genai.genai.Client", genai_client
@@ -89,6 +320,7 @@ async def test_outbox_process_and_project_and_request_risk_analysis(
 
     # when
     await processor.process_and_send_to_risk_analyzer(forever=False)
+    await processor.close()
 
     # give some time for event loop to process request before we validate
     await asyncio.sleep(3)
@@ -129,7 +361,8 @@ async def test_outbox_process_and_project_and_request_risk_analysis_for_risky_me
     }
     """
     mock = Mock()
-    mock.models.generate_content.return_value = Mock(text=analysis)
+    mock.aio.models.generate_content = AsyncMock(return_value=Mock(text=analysis))
+    mock.aio.aclose = AsyncMock()
     genai_client = Mock(return_value=mock)
     monkeypatch.setattr(
         "src.genai.risk_analyzer_clients.google_genai.genai.Client", genai_client
@@ -137,6 +370,7 @@ async def test_outbox_process_and_project_and_request_risk_analysis_for_risky_me
 
     # when
     await processor.process_and_send_to_risk_analyzer(forever=False)
+    await processor.close()
 
     # give some time for event loop to process request before we validate
     await asyncio.sleep(3)
@@ -152,3 +386,281 @@ async def test_outbox_process_and_project_and_request_risk_analysis_for_risky_me
     assert analyses[0].analysis == json.loads(analysis)
     assert analyses[0].detected_risk == True
     assert analyses[0].created_at is not None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failed_risk_analysis_stays_queued_after_projection_commits(
+    db_session, create_user, create_conversation, create_message, monkeypatch
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    processor = OutboxProcessor(
+        db_session, prompt_path=str(Path.cwd() / "prompts" / "risk_analyzer.yaml")
+    )
+    monkeypatch.setattr(
+        "src.genai.risk_analyzer_clients.google_genai.genai.Client",
+        Mock(side_effect=RuntimeError("provider is down")),
+    )
+
+    # when
+    await processor.process_and_send_to_risk_analyzer(forever=False)
+    await processor.close()
+
+    # then - projection was committed and the job waits for its lease to expire
+    job_repository = RiskAnalysisJobRepository(db_session)
+    jobs = await job_repository.all()
+    assert [job.conversation_id for job in jobs] == [conversation_id]
+    assert jobs[0].locked_until is not None
+    outboxes = await ConversationOutboxRepository(db_session).all()
+    assert all(outbox.is_processed for outbox in outboxes)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_risk_analysis_jobs_are_leased(db_session):
+    # given
+    job_repository = RiskAnalysisJobRepository(db_session)
+    await job_repository.enqueue(["first", "second"])
+    await db_session.flush()
+
+    # when
+    first = await job_repository.claim(limit=1, lease=60)
+    second = await job_repository.claim(limit=2, lease=0)
+    third = await job_repository.claim(limit=2, lease=60)
+
+    # then - the expired lease is handed out again, the active one is not
+    assert [job.conversation_id for job in first] == ["first"]
+    assert [job.conversation_id for job in second] == ["second"]
+    assert [job.conversation_id for job in third] == ["second"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_risk_analysis_requests_are_debounced(db_session):
+    # given
+    job_repository = RiskAnalysisJobRepository(db_session)
+    await job_repository.enqueue(["burst"], quiet_period=10, max_delay=60)
+
+    # when - more messages arrive during the quiet period
+    await job_repository.enqueue(["burst"], quiet_period=10, max_delay=60)
+
+    # then
+    jobs = await job_repository.all()
+    assert len(jobs) == 1
+    assert await job_repository.claim(limit=10, lease=60) == []
+
+    # when - the burst goes on for longer than the max delay
+    await job_repository.update(
+        jobs[0].id,
+        created_at=datetime.datetime.now(datetime.UTC)
+        - datetime.timedelta(seconds=120),
+    )
+    await job_repository.enqueue(["burst"], quiet_period=10, max_delay=60)
+
+    # then
+    claimed = await job_repository.claim(limit=10, lease=60)
+    assert [job.conversation_id for job in claimed] == ["burst"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_waiting_survives_database_errors(db_session, monkeypatch):
+    # given
+    processor = OutboxProcessor(db_session)
+    monkeypatch.setattr(
+        processor._job_repository,
+        "next_run_after",
+        AsyncMock(side_effect=ConnectionError("connection lost")),
+    )
+
+    # when
+    await processor._wait_for_new_events(interval=0)
+
+    # then - it waited the interval instead of raising
+    processor._job_repository.next_run_after.assert_awaited_once()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outdated_risk_analysis_is_skipped(db_session, monkeypatch):
+    # given
+    job_repository = RiskAnalysisJobRepository(db_session)
+    await job_repository.enqueue(["conversation"])
+    (claimed,) = await job_repository.claim(limit=1, lease=60)
+    await job_repository.enqueue(["conversation"], quiet_period=10, max_delay=60)
+    await db_session.commit()
+    analyze = AsyncMock(return_value=None)
+    monkeypatch.setattr("src.outbox_processor._do_risk_analysis", analyze)
+    processor = OutboxProcessor(db_session)
+
+    # when
+    await processor._do_bounded_risk_analysis(claimed)
+    await processor.close()
+
+    # then - only the newer, pending job is left
+    analyze.assert_not_awaited()
+    jobs = await job_repository.all()
+    assert [job.locked_until for job in jobs] == [None]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failed_risk_analysis_is_retried_with_backoff_then_dropped(
+    db_session, monkeypatch
+):
+    # given
+    job_repository = RiskAnalysisJobRepository(db_session)
+    await job_repository.enqueue(["conversation"])
+    await db_session.commit()
+    monkeypatch.setattr(
+        "src.outbox_processor._do_risk_analysis",
+        AsyncMock(return_value="prompt is too long"),
+    )
+    processor = OutboxProcessor(db_session, job_lease=60, analysis_max_attempts=2)
+
+    # when
+    await processor._request_risk_analysis()
+
+    # then - the retry is not due before the lease doubled
+    (job,) = await job_repository.all()
+    assert job.attempts == 1
+    assert job.last_error == "prompt is too long"
+    assert job.locked_until > datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+        seconds=50
+    )
+
+    # when - the retry is due and fails again
+    await job_repository.update(job.id, locked_until=None)
+    await db_session.commit()
+    await processor._request_risk_analysis()
+    await processor.close()
+
+    # then
+    assert await job_repository.all() == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_risk_analyses_run_concurrently_on_their_own_sessions(
+    db_session, session_factory, monkeypatch
+):
+    # given
+    await RiskAnalysisJobRepository(db_session).enqueue(["a", "b", "c", "d"])
+    await db_session.commit()
+    processor = OutboxProcessor(
+        db_session, session_factory=session_factory, max_concurrent_analyses=2
+    )
+    sessions = set()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def analyze(risk_analyzer, session, conversation_id):
+        nonlocal in_flight, max_in_flight
+        sessions.add(session)
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return "provider is down"
+
+    monkeypatch.setattr("src.outbox_processor._do_risk_analysis", analyze)
+    # the test sessions share one connection, keep them off the database
+    monkeypatch.setattr(
+        "src.outbox_processor.RiskAnalysisJobRepository.has_pending",
+        AsyncMock(return_value=False),
+    )
+    monkeypatch.setattr(
+        "src.outbox_processor.RiskAnalysisJobRepository.schedule_retry", AsyncMock()
+    )
+
+    # when
+    await processor._request_risk_analysis()
+    await processor.close()
+
+    # then
+    assert max_in_flight == 2
+    assert len(sessions) == 4
+    assert db_session not in sessions
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_risk_analysis_sends_summary_and_new_messages_only(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "I feel down", "vini@vini.com")
+    processor = OutboxProcessor(db_session)
+    await processor._process()
+    await db_session.commit()
+    ai_client = Mock()
+    ai_client.get_risk_assessment = AsyncMock(
+        return_value=AIAnalysis(risk_found=False, summary="The user feels down.")
+    )
+    analyzer = RiskAnalyzer(
+        ai_client,
+        str(Path.cwd() / "prompts" / "risk_analyzer.yaml"),
+        full_analysis_every=2,
+    )
+
+    def last_prompt() -> str:
+        return ai_client.get_risk_assessment.await_args.kwargs["prompt"]
+
+    # when - the first analysis reads the whole transcript
+    first = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    assert "I feel down" in last_prompt()
+    assert first.summary == "The user feels down."
+    assert first.analyses_since_full == 0
+    assert "summary" not in first.analysis
+
+    # when - nothing new was said
+    unchanged = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    assert unchanged.id == first.id
+    assert ai_client.get_risk_assessment.await_count == 1
+
+    # when - the next one only the summary and what was said since
+    await create_message(user_id, conversation_id, "I bought pills", "vini@vini.com")
+    await processor._process()
+    await db_session.commit()
+    second = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    assert "The user feels down." in last_prompt()
+    assert "I bought pills" in last_prompt()
+    assert "I feel down" not in last_prompt()
+    assert second.analyzed_version > first.analyzed_version
+    assert second.analyses_since_full == 1
+
+    # when - the periodic full analysis is due
+    await create_message(user_id, conversation_id, "bye", "vini@vini.com")
+    await processor._process()
+    await db_session.commit()
+    third = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    assert "I feel down" in last_prompt()
+    assert third.analyses_since_full == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outbox_listener_wakes_up_on_committed_notification(engine, postgres_url):
+    # given
+    listener = OutboxListener(asyncpg_dsn(postgres_url))
+    await listener.start()
+
+    try:
+        # when/then - nothing was appended yet
+        assert await listener.wait(timeout=0.1) is False
+
+        async with engine.begin() as connection:
+            await connection.execute(
+                text("SELECT pg_notify(:channel, 'conversation')"),
+                {"channel": OUTBOX_CHANNEL},
+            )
+
+        # then
+        assert await listener.wait(timeout=5) is True
+        assert await listener.wait(timeout=0.1) is False
+    finally:
+        await listener.close()
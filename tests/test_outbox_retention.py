@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.db.repositories.conversation_outbox import ConversationOutboxRepository
+from src.outbox_retention import OutboxRetention
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ensure_partitions_creates_upcoming_months(db_session):
+    # given
+    retention = OutboxRetention(db_session)
+
+    # when
+    created = await retention.ensure_partitions(
+        months_ahead=2, today=datetime.date(2031, 11, 20)
+    )
+
+    # then
+    assert created == [
+        "conversation_outbox_p203111",
+        "conversation_outbox_p203112",
+        "conversation_outbox_p203201",
+    ]
+    assert (
+        await retention.ensure_partitions(
+            months_ahead=2, today=datetime.date(2031, 11, 20)
+        )
+        == []
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_drop_expired_partitions_keeps_pending_entries(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "hi", "vini@vini.com")
+    retention = OutboxRetention(db_session)
+    await retention.create_partitions(
+        datetime.date(2020, 1, 1), datetime.date(2020, 2, 1)
+    )
+    started, message = await ConversationOutboxRepository(db_session).all()
+    # move the entries into the old partitions
+    await db_session.execute(
+        text(
+            "UPDATE conversation_outbox SET created_at = '2020-01-15', is_processed = true "
+            "WHERE id = :id"
+        ),
+        {"id": started.id},
+    )
+    await db_session.execute(
+        text("UPDATE conversation_outbox SET created_at = '2020-02-15' WHERE id = :id"),
+        {"id": message.id},
+    )
+
+    # when
+    dropped = await retention.drop_expired_partitions(
+        retention_days=30, today=datetime.date(2020, 6, 1)
+    )
+
+    # then
+    assert dropped == ["conversation_outbox_p202001"]
+    assert await retention.partitions() == ["conversation_outbox_p202002"]
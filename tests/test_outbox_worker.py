@@ -0,0 +1,26 @@
+from src.outbox_worker import parse_args
+from src.settings import settings
+
+
+def test_parse_args_defaults_to_settings():
+    # when
+    args = parse_args([])
+
+    # then
+    assert args.batch_size == settings.outbox_batch_size
+    assert args.concurrency == settings.outbox_max_concurrent_analyses
+    assert args.interval == settings.outbox_poll_interval
+    assert not args.once
+
+
+def test_parse_args_overrides():
+    # when
+    args = parse_args(
+        ["--batch-size", "50", "--concurrency", "4", "--interval", "5", "--once"]
+    )
+
+    # then
+    assert args.batch_size == 50
+    assert args.concurrency == 4
+    assert args.interval == 5
+    assert args.once
@@ -0,0 +1,97 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.db.repositories.conversation_analysis import ConversationRiskAnalysisRepository
+from src.genai.pre_screener import LexiconPreScreener, PreScreenMode
+from src.genai.risk_analyzer import RiskAnalyzer
+from src.genai.risk_analyzer_clients.base import AIAnalysis
+from src.outbox_processor import OutboxProcessor
+
+
+class TestLexiconPreScreener:
+    def test_scores_heaviest_risk_term(self):
+        # given
+        screener = LexiconPreScreener()
+
+        # then
+        assert screener.score("I feel alone and I want to die") == 1.0
+        assert screener.score("so hopeless lately") == 0.6
+        assert screener.score("ok thanks") == 0.0
+
+    def test_strict_mode_skips_only_known_benign_messages(self):
+        # given
+        screener = LexiconPreScreener(mode=PreScreenMode.STRICT)
+
+        # then
+        assert not screener.should_analyze(["ok thanks!", "hi"])
+        assert screener.should_analyze(["ok thanks!", "what a week"])
+
+    def test_strict_mode_analyzes_answers(self):
+        # given
+        screener = LexiconPreScreener(mode=PreScreenMode.STRICT)
+
+        # then
+        assert screener.should_analyze(["yes"])
+        assert screener.should_analyze(["no"])
+        assert screener.should_analyze(["yeah sure"])
+
+    def test_threshold_mode_skips_low_scores(self):
+        # given
+        screener = LexiconPreScreener(mode=PreScreenMode.THRESHOLD, threshold=0.5)
+
+        # then
+        assert not screener.should_analyze(["what a week", "feeling alone"])
+        assert screener.should_analyze(["what a week", "everything is hopeless"])
+
+    def test_analyzes_every_nth_message_anyway(self):
+        # given
+        screener = LexiconPreScreener(mode=PreScreenMode.STRICT, sample_every=3)
+
+        # then
+        assert not screener.should_analyze(["ok", "ok"])
+        assert screener.should_analyze(["ok", "ok", "ok"])
+
+    def test_off_mode_analyzes_everything(self):
+        # given
+        screener = LexiconPreScreener(mode=PreScreenMode.OFF)
+
+        # then
+        assert screener.should_analyze(["ok"])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_benign_messages_do_not_reach_the_analyzer(
+    db_session, create_user, create_conversation, create_message
+):
+    # given
+    user_id = (await create_user("vini", "vini@vini.com"))["user_id"]
+    conversation_id = (await create_conversation(user_id))["conversation_id"]
+    await create_message(user_id, conversation_id, "ok thanks", "vini@vini.com")
+    processor = OutboxProcessor(db_session)
+    await processor._process()
+    await db_session.commit()
+    ai_client = Mock(model_id="model")
+    ai_client.get_risk_assessment = AsyncMock(
+        return_value=AIAnalysis(risk_found=True, risk_level="high")
+    )
+    analyzer = RiskAnalyzer(
+        ai_client,
+        str(Path.cwd() / "prompts" / "risk_analyzer.yaml"),
+        pre_screener=LexiconPreScreener(mode=PreScreenMode.STRICT),
+    )
+
+    # when
+    skipped = await analyzer.analyze(db_session, conversation_id)
+    await create_message(user_id, conversation_id, "I want to die", "vini@vini.com")
+    await processor._process()
+    await db_session.commit()
+    analyzed = await analyzer.analyze(db_session, conversation_id)
+
+    # then
+    assert skipped is None
+    ai_client.get_risk_assessment.assert_awaited_once()
+    assert "ok thanks" in ai_client.get_risk_assessment.await_args.kwargs["prompt"]
+    analyses = await ConversationRiskAnalysisRepository(db_session).all(conversation_id)
+    assert [analysis.id for analysis in analyses] == [analyzed.id]
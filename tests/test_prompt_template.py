@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+import yaml
+
+from src.genai.risk_analyzer import PromptTemplate
+
+PROMPT_PATH = Path.cwd() / "prompts" / "risk_analyzer.yaml"
+
+
+class TestPromptTemplate:
+    def test_renders_like_serializing_the_whole_prompt(self):
+        # given
+        template = PromptTemplate(str(PROMPT_PATH))
+        with open(PROMPT_PATH, "r", encoding="utf-8") as f:
+            prompt = yaml.safe_load(f)
+
+        # when
+        rendered = template.render("Text: 'hi'\n")
+
+        # then
+        assert rendered == yaml.dump(prompt, allow_unicode=True).replace(
+            "{{conversation_history}}", "Text: 'hi'\n"
+        )
+
+    def test_reloads_when_the_file_changes(self, tmp_path):
+        # given
+        path = tmp_path / "prompt.yaml"
+        path.write_text('task: "v1"\nhistory: "{{conversation_history}}"\n')
+        template = PromptTemplate(str(path))
+        before = template.render("hi")
+
+        # when
+        path.write_text('task: "v2"\nhistory: "{{conversation_history}}"\n')
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+        after = template.render("hi")
+
+        # then
+        assert "v1" in before and "hi" in before
+        assert "v2" in after and "hi" in after
+
+    def test_keeps_the_loaded_prompt_when_the_new_one_is_invalid(self, tmp_path):
+        # given
+        path = tmp_path / "prompt.yaml"
+        path.write_text('task: "v1"\nhistory: "{{conversation_history}}"\n')
+        template = PromptTemplate(str(path))
+
+        # when
+        path.write_text("task: [unclosed\n")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+        rendered = template.render("hi")
+
+        # then
+        assert "v1" in rendered and "hi" in rendered